@@ -21,8 +21,28 @@ readable protocol messages.
 * "-log" or "-l" saves the match to a csv file under src/logs.
 It will record all moves and the end state of the game. Check
 the documentation pdf for more details.
+* "log_dir=name" saves the log in the given directory under logs
+instead. It may contain date codes, such as %Y-%m-%d for one
+directory per day.
+* "-log_thread" or "-lt" writes the log on a background thread, so it
+never slows the engine down.
+* "log_flush=s" also flushes the log every s seconds. By default it is
+only written when its buffer fills up and at the end of the match.
+* "time=s" gives each player s seconds for the whole match. Defaults
+to 300.
+* "increment=s" adds s seconds to a player's clock after each of their
+moves.
+* "move_time=s" limits every move to s seconds.
+* "-clock" or "-c" tells the agents their time: START gets a fourth
+field with the time, increment and move limit in milliseconds (0 for
+no limit), and CHANGE a fifth with the Red and Blue clocks.
 * "-switch" or "-s" will invert the order of agents playing. Use
 this argument to quickly test your agent as Blue instead of Red.
+* "-bitboard" or "-bb" makes the engine keep the board as bitmasks
+instead of tile objects. The protocol and the results are the same.
+* "transport=name" sets how the engine talks to the agents: "tcp"
+(default), "unix" for Unix domain sockets or "socketpair" for sockets
+the agents inherit. Run src/Transport.py to compare their latency.
 """
 import shlex
 import subprocess
@@ -1,13 +1,16 @@
-import socket
+import os
+import sys
 from time import sleep
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
+from Transport import Transport
 
-def main():
-    HOST = "127.0.0.1"
-    PORT = 1234
 
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.connect((HOST, PORT))
+def main():
+    with Transport.connect() as s:
+        token = os.environ.get("HEX_TOKEN")
+        if (token is not None):
+            s.sendall(bytes(f"HELLO;{token}\n", "utf-8"))
         sleep(0.5)
 
 
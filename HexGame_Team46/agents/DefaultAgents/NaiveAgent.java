@@ -1,13 +1,16 @@
 import java.net.*;
+import java.nio.channels.Channels;
+import java.nio.channels.SocketChannel;
 import java.util.ArrayList;
 import java.util.Random;
 import java.io.*;
 
 class NaiveAgent{
     public static String HOST = "127.0.0.1";
-    public static int PORT = 1234;
+    public static int PORT = System.getenv("HEX_PORT") == null ?
+        1234 : Integer.parseInt(System.getenv("HEX_PORT"));
 
-    private Socket s;
+    private Closeable s;
     private PrintWriter out;
     private BufferedReader in;
 
@@ -16,9 +19,44 @@ class NaiveAgent{
     private int boardSize = 11;
 
     private void Connect() throws UnknownHostException, IOException{
-        s = new Socket(HOST, PORT);
-        out = new PrintWriter(s.getOutputStream(), true);
-        in = new BufferedReader(new InputStreamReader(s.getInputStream()));
+        // the engine gives the address as "tcp:host:port", "unix:path" or
+        // "fd:n", like Transport.connect in src
+        String address = System.getenv("HEX_ADDRESS");
+        if (address == null) address = "tcp:" + HOST + ":" + PORT;
+
+        String kind = address.substring(0, address.indexOf(':'));
+        String location = address.substring(address.indexOf(':') + 1);
+        InputStream input;
+        OutputStream output;
+
+        if (kind.equals("unix")){
+            // needs Java 16 or later
+            SocketChannel channel = SocketChannel.open(
+                UnixDomainSocketAddress.of(location));
+            s = channel;
+            input = Channels.newInputStream(channel);
+            output = Channels.newOutputStream(channel);
+        } else if (kind.equals("tcp")){
+            int split = location.lastIndexOf(':');
+            Socket socket = new Socket(location.substring(0, split),
+                Integer.parseInt(location.substring(split + 1)));
+            socket.setTcpNoDelay(true);
+            s = socket;
+            input = socket.getInputStream();
+            output = socket.getOutputStream();
+        } else {
+            // Java cannot take over an inherited socket, as socketpair needs
+            throw new IOException("HEX_ADDRESS " + address + " is not " +
+                "supported. Use transport=tcp or transport=unix.");
+        }
+
+        out = new PrintWriter(output, true);
+        in = new BufferedReader(new InputStreamReader(input));
+
+        // identifies the agent when the engine hosts several games
+        String token = System.getenv("HEX_TOKEN");
+        if (token != null) out.print("HELLO;" + token + "\n");
+        out.flush();
     }
 
     private String getMessage() throws IOException{
@@ -43,7 +81,7 @@ class NaiveAgent{
             System.out.println("ERROR: Host not found.");
             return;
         } catch (IOException e){
-            System.out.println("ERROR: Could not establish I/O.");
+            System.out.println("ERROR: Could not establish I/O. " + e.getMessage());
             return;
         }
 
@@ -1,15 +1,20 @@
-import socket
-from random import choice
+import os
+import sys
+from random import choice, seed
 from time import sleep
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
+from LineReader import LineReader
+from Transport import Transport
+
 
 class NaiveAgent():
     """This class describes the default Hex agent. It will randomly send a
     valid move at each turn, and it will choose to swap with a 50% chance.
     """
 
-    HOST = "127.0.0.1"
-    PORT = 1234
+    # the engine may start another game on this connection
+    PERSISTENT = os.environ.get("HEX_NEWGAME") == "1"
 
     def run(self):
         """A finite-state machine that cycles through waiting for input
@@ -39,8 +44,15 @@ class NaiveAgent():
         message.
         """
         
-        self._s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self._s.connect((NaiveAgent.HOST, NaiveAgent.PORT))
+        self._s = Transport.connect()
+
+        # identifies the agent when the engine hosts several games
+        token = os.environ.get("HEX_TOKEN")
+        if (token is not None):
+            self._s.sendall(bytes(f"HELLO;{token}\n", "utf-8"))
+
+        # buffered reader that returns one whole message at a time
+        self._reader = LineReader(self._s)
 
         return 2
 
@@ -49,8 +61,10 @@ class NaiveAgent():
         answers if it is Red or waits if it is Blue.
         """
         
-        data = self._s.recv(1024).decode("utf-8").strip().split(";")
+        data = self._reader.read_message().strip().split(";")
         if (data[0] == "START"):
+            self._turn_count = 1
+            self._choices = []
             self._board_size = int(data[1])
             for i in range(self._board_size):
                 for j in range(self._board_size):
@@ -62,6 +76,10 @@ class NaiveAgent():
             else:
                 return 4
 
+        elif (data[0] == "" and NaiveAgent.PERSISTENT):
+            # the engine closed the connection instead of a new game
+            return 5
+
         else:
             print("ERROR: No START message received.")
             return 0
@@ -86,8 +104,17 @@ class NaiveAgent():
 
         self._turn_count += 1
 
-        data = self._s.recv(1024).decode("utf-8").strip().split(";")
-        if (data[0] == "END" or data[-1] == "END"):
+        data = self._reader.read_message().strip().split(";")
+        if (data[0] == "END" and NaiveAgent.PERSISTENT):
+            # ready for the next START on this connection
+            self._s.sendall(bytes("NEWGAME\n", "utf-8"))
+            return 2
+        elif (data[0] == "END"):
+            return 5
+        elif (data[3] == "END" and NaiveAgent.PERSISTENT):
+            # a persistent agent waits for END instead
+            return 4
+        elif (data[3] == "END"):
             return 5
         else:
 
@@ -97,7 +124,9 @@ class NaiveAgent():
                 x, y = data[1].split(",")
                 self._choices.remove((int(x), int(y)))
 
-            if (data[-1] == self._colour):
+            # the fourth field is the next player; the engine may
+            # add the clocks after it
+            if (data[3] == self._colour):
                 return 3
 
         return 4
@@ -122,5 +151,9 @@ class NaiveAgent():
 
 
 if (__name__ == "__main__"):
+    # the engine may fix the random moves, so a game can be replayed
+    if ("HEX_SEED" in os.environ):
+        seed(int(os.environ["HEX_SEED"]))
+
     agent = NaiveAgent()
     agent.run()
@@ -1,15 +1,18 @@
-import socket
+import os
+import sys
 from time import sleep
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
+from Transport import Transport
 
-def main():
-    HOST = "127.0.0.1"
-    PORT = 1234
 
+def main():
     MAX_SIZE_MESSAGE_B = 1024
 
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.connect((HOST, PORT))
+    with Transport.connect() as s:
+        token = os.environ.get("HEX_TOKEN")
+        if (token is not None):
+            s.sendall(bytes(f"HELLO;{token}\n", "utf-8"))
 
         too_long_message = bytes("".join(
             ["X" for i in range(MAX_SIZE_MESSAGE_B * 2)]
@@ -1,20 +1,90 @@
-from random import choice
+from heapq import heappop, heappush
+from math import inf
+from random import Random, shuffle
 from re import X
 
 class Board:
+	# Zobrist keys per board size, shared by every board of that size.
+	ZOBRIST_SEED = 46
+	zobrist_keys = {}
+
+	# Coordinates and neighbour indices of every cell per board size, for work on the flat board.
+	cell_tables = {}
+
+	NEIGHBOUR_OFFSETS = [ (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1) ]
+
+	# Codes of the cells in the flat board.
+	EMPTY, RED, BLUE = 0, 1, 2
+
 	def __init__(self, size=11, red_first=True):
 		self.__board_size = size
-		self.__board = []
 
 		self.red_turn = red_first
 
+		# The moves made, most recent last, so that they can be undone: the index of the cell, the number of group
+		# merges before it and the winner before it.
+		self.__history = []
+
 		self.__red_value = 'R'
 		self.__blue_value = 'B'
 		self.__empty_value = '0'
 
-		self.neighbour_offsets = [ (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1) ]
+		# The value of each cell code, and the code of each value.
+		self.__values = (self.__empty_value, self.__red_value, self.__blue_value)
+		self.__codes = { value: code for code, value in enumerate(self.__values) }
+
+		# Union-find groups of the stones, with four virtual nodes for the sides: red's x = 0 and x = size - 1 sides,
+		# then blue's y = 0 and y = size - 1 sides. Groups are merged by size without path compression, so finds stay
+		# short and every merge can be undone. A colour has won once its two sides are in the same group.
+		cells = size ** 2
+		self.__parent = list(range(cells + 4))
+		self.__group_size = [1] * (cells + 4)
+		self.__merges = []
+		self.__sides = (None, (cells, cells + 1), (cells + 2, cells + 3))
+		self.__winner = self.__empty_value
+
+		# Zobrist hash of the position (stones and player to move), and of its 180 degree rotation.
+		self.__keys = Board.zobristKeys(size)
+		self.__cell_keys = (None, self.__keys['R'], self.__keys['B'])
+		self.__hash = 0
+		self.__rotated_hash = 0
+		if not red_first:
+			self.__hash ^= self.__keys['turn']
+			self.__rotated_hash ^= self.__keys['turn']
+
+		self.neighbour_offsets = Board.NEIGHBOUR_OFFSETS
 		self.populate()
 
+	@staticmethod
+	def zobristKeys(size):
+		if size not in Board.zobrist_keys:
+			rng = Random(Board.ZOBRIST_SEED + size)
+			Board.zobrist_keys[size] = {
+				'R': [rng.getrandbits(64) for _ in range(size ** 2)],
+				'B': [rng.getrandbits(64) for _ in range(size ** 2)],
+				'turn': rng.getrandbits(64)
+			}
+
+		return Board.zobrist_keys[size]
+
+	@staticmethod
+	def cellTables(size):
+		if size not in Board.cell_tables:
+			coords = [(i % size, i // size) for i in range(size ** 2)]
+			neighbours = [
+				[(y + j) * size + x + i for i, j in Board.NEIGHBOUR_OFFSETS if 0 <= x + i < size and 0 <= y + j < size]
+				for x, y in coords
+			]
+			Board.cell_tables[size] = (coords, neighbours)
+
+		return Board.cell_tables[size]
+
+	def getHash(self):
+		return self.__hash
+
+	def getCanonicalHash(self):
+		return min(self.__hash, self.__rotated_hash)
+
 	def getBoardSize(self):
 		return self.__board_size
 
@@ -28,43 +98,117 @@ class Board:
 		return self.__empty_value
 
 	def setRedTurn(self):
-		self.red_turn = True
+		if not self.red_turn:
+			self.togglePlayerTurn()
 
 	def setBlueTurn(self):
-		self.red_turn = False
+		if self.red_turn:
+			self.togglePlayerTurn()
 
 	def togglePlayerTurn(self):
 		self.red_turn = not self.red_turn
+		self.__hash ^= self.__keys['turn']
+		self.__rotated_hash ^= self.__keys['turn']
 		
 	def populate(self):
-		for i in range(self.__board_size ** 2):
-			self.__board.append(self.__empty_value)
-
-	def getNeighbours(self, x, y):
-		return [(x + i, y + j) for i, j in self.neighbour_offsets]
-
-	def __getIndex(self, x, y):
-		if x < 0:
-			raise IndexError(f"Expected x >= 0. Got x = {x}.")
+		# One cell code per cell, indexed by y * size + x.
+		self.__board = bytearray(self.__board_size ** 2)
 
-		if y < 0:
-			raise IndexError(f"Expected y >= 0. Got y = {y}.")
+		# The indices of the empty cells in no particular order, and the position of each in that list, so that a
+		# cell can be taken out by moving the last one into its place.
+		self.__empty = list(range(self.__board_size ** 2))
+		self.__empty_position = list(range(self.__board_size ** 2))
 
-		if x >= self.__board_size:
-			raise IndexError(f"Expected x < {self.__board_size}. Got x = {x}.")
+		# Cells closed by the last path search, marked with its number.
+		self.__closed = [0] * self.__board_size ** 2
+		self.__search_count = 0
 
-		if y >= self.__board_size:
-			raise IndexError(f"Expected y < {self.__board_size}. Got y = {y}.")
+	def getNeighbours(self, x, y):
+		coords, neighbours = Board.cellTables(self.__board_size)
+		return [coords[j] for j in neighbours[self.__getIndex(x, y)]]
 
+	def __getIndex(self, x, y):
+		size = self.__board_size
+		if not (0 <= x < size and 0 <= y < size):
+			raise IndexError(f"Expected 0 <= x, y < {size}. Got x = {x}, y = {y}.")
 
-		return y * self.__board_size + x
+		return y * size + x
 
 	def __setPiece(self, x, y, value):
-		if self.getPiece(x, y) != self.__empty_value:
+		index = self.__getIndex(x, y)
+		if self.__board[index] != Board.EMPTY:
 			self.printBoard()
 			raise ValueError(f"There is already a piece at ({x}, {y}).")
-		
-		self.__board[self.__getIndex(x, y)] = value
+
+		code = self.__codes[value]
+		if code == Board.EMPTY:
+			return
+
+		self.__board[index] = code
+		self.__takeEmpty(index)
+		self.__hash ^= self.__cell_keys[code][index]
+		self.__rotated_hash ^= self.__cell_keys[code][self.__board_size ** 2 - 1 - index]
+		self.__join(index, x, y, code)
+
+	def __takeEmpty(self, index):
+		empty = self.__empty
+		position = self.__empty_position[index]
+		last = empty.pop()
+		if last != index:
+			empty[position] = last
+			self.__empty_position[last] = position
+
+	def __putEmpty(self, index):
+		self.__empty_position[index] = len(self.__empty)
+		self.__empty.append(index)
+
+	def __find(self, index):
+		parent = self.__parent
+		while parent[index] != index:
+			index = parent[index]
+
+		return index
+
+	def __union(self, a, b):
+		a = self.__find(a)
+		b = self.__find(b)
+		if a == b:
+			return
+
+		if self.__group_size[a] < self.__group_size[b]:
+			a, b = b, a
+
+		self.__parent[b] = a
+		self.__group_size[a] += self.__group_size[b]
+		self.__merges.append(b)
+
+	def __join(self, index, x, y, code):
+		"""Merges a new stone with the groups of its neighbours of the same colour and with the sides it touches."""
+		size = self.__board_size
+		_, neighbours = Board.cellTables(size)
+		board = self.__board
+
+		for j in neighbours[index]:
+			if board[j] == code:
+				self.__union(index, j)
+
+		side_a, side_b = self.__sides[code]
+		edge = x if code == Board.RED else y
+		if edge == 0:
+			self.__union(index, side_a)
+		if edge == size - 1:
+			self.__union(index, side_b)
+
+		if self.__winner == self.__empty_value and self.__find(side_a) == self.__find(side_b):
+			self.__winner = self.__values[code]
+
+	def __unmerge(self, count):
+		"""Undoes group merges until only count are left."""
+		while len(self.__merges) > count:
+			b = self.__merges.pop()
+			a = self.__parent[b]
+			self.__group_size[a] -= self.__group_size[b]
+			self.__parent[b] = b
 	
 	def setRedPiece(self, x, y):
 		self.__setPiece(x, y, self.__red_value)
@@ -72,8 +216,15 @@ class Board:
 	def setBluePiece(self, x, y):
 		self.__setPiece(x, y, self.__blue_value)
 
+	def getIndex(self, x, y):
+		return self.__getIndex(x, y)
+
 	def getPiece(self, x, y):
-		return self.__board[self.__getIndex(x, y)]
+		size = self.__board_size
+		if 0 <= x < size and 0 <= y < size:
+			return self.__values[self.__board[y * size + x]]
+
+		return self.__values[self.__board[self.__getIndex(x, y)]]
 
 	def isRed(self, x, y):
 		return self.getPiece(x, y) == self.__red_value
@@ -93,147 +244,188 @@ class Board:
 
 		return max(abs(dx), abs(dy))
 
-	def __shortestPath(self, x0, y0, x1, y1):
-		found = PriorityQueue(lowest_to_highest=False)
-		searched = []
-		path = []
-
-		colour = self.getPiece(x0, y0)
-
-		if self.getPiece(x1, y1) != colour:
-			return None, None
-
-		found.add((x0, y0, None, None), self.hexDist(x0, y0, x1, y1))
-		
-		while not found.isEmpty():
-			x, y, px, py = found.pop()
-			searched.append((x, y))
-			path.append((px, py))
-
-			if (x, y) == (x1, y1):
-				return searched, path
-
-			for i, j in self.getNeighbours(x, y):
-				try:
-					c = self.getPiece(i, j)
-				except IndexError:
-					c = None
-
-				if c == colour and (i, j) not in searched:
-					found.add((i, j, x, y), self.hexDist(i, j, x1, y1))
-
-		return searched, None
+	def __search(self, starts, code, goal, remaining, stone_cost, empty_cost):
+		"""
+		A* search from the start cells, given as (index, cost) pairs, to the first cell goal accepts. Steps onto cells
+		of the given code cost stone_cost, and steps onto empty cells cost empty_cost, or are not allowed if it is None.
+		remaining(index) is the least number of steps left to a goal; scaled by the cheapest step it never overestimates,
+		so the path found is a cheapest one. Returns the cost and the cells of the path, or None, None.
+		"""
+		_, neighbours = Board.cellTables(self.__board_size)
+		board = self.__board
+
+		# Cells are closed by marking them with the number of this search, so the list is reused without clearing.
+		self.__search_count += 1
+		closed = self.__closed
+		search = self.__search_count
+
+		cheapest = stone_cost if empty_cost is None else min(stone_cost, empty_cost)
+		best = {}
+		parent = {}
+		heap = []
+		for index, cost in starts:
+			if cost < best.get(index, inf):
+				best[index] = cost
+				parent[index] = None
+				heappush(heap, (cost + cheapest * remaining(index), cost, index))
+
+		while heap:
+			_, cost, index = heappop(heap)
+			if closed[index] == search:
+				continue
+			closed[index] = search
+
+			if goal(index):
+				path = []
+				while index is not None:
+					path.append(index)
+					index = parent[index]
+				path.reverse()
+				return cost, path
+
+			for j in neighbours[index]:
+				if closed[j] == search:
+					continue
+
+				c = board[j]
+				if c == code:
+					step = stone_cost
+				elif c == Board.EMPTY and empty_cost is not None:
+					step = empty_cost
+				else:
+					continue
+
+				if cost + step < best.get(j, inf):
+					best[j] = cost + step
+					parent[j] = index
+					heappush(heap, (cost + step + cheapest * remaining(j), cost + step, j))
+
+		return None, None
+
+	def shortestPath(self, x0, y0, x1, y1, stone_cost=1, empty_cost=None):
+		"""
+		Returns the cheapest path of cells from (x0, y0) to (x1, y1) through cells of the colour of (x0, y0), or None if
+		there is none. By default every step costs 1, so this is the shortest path. With empty_cost, the path may also
+		cross empty cells at that cost.
+		"""
+		start = self.__getIndex(x0, y0)
+		target = self.__getIndex(x1, y1)
+		code = self.__board[start]
+
+		if self.__board[target] != code and (empty_cost is None or self.__board[target] != Board.EMPTY):
+			return None
 
-	def shortestPath(self, x0, y0, x1, y1):
-		searched, path = self.__shortestPath(x0, y0, x1, y1)
+		coords, _ = Board.cellTables(self.__board_size)
+		_, path = self.__search(
+			[(start, 0)], code, lambda index: index == target,
+			lambda index: self.hexDist(*coords[index], x1, y1), stone_cost, empty_cost
+		)
 
-		if path == None:
+		if path is None:
 			return None
 
-		order = [(x0, y0)]
-		current = (x1, y1)
+		return [coords[index] for index in path]
 
-		while current != (x0, y0):
-			order.insert(1, current)
-			i = searched.index(current)
-			current = path[i]
+	def connectionDistance(self, colour):
+		"""
+		Returns the least number of empty cells the given colour still has to fill to join its sides, 0 if it has
+		already won, or None if it can no longer win. Stones of the colour are free to cross and empty cells cost 1.
+		"""
+		size = self.__board_size
+		code = self.__codes[colour]
+		board = self.__board
 
-		return order
+		if code == Board.RED:
+			side = range(0, size ** 2, size)
+			goal = lambda index: index % size == size - 1
+		else:
+			side = range(size)
+			goal = lambda index: index // size == size - 1
 
+		starts = [(i, 0 if board[i] == code else 1) for i in side if board[i] in (code, Board.EMPTY)]
+		cost, _ = self.__search(starts, code, goal, lambda index: 0, 0, 1)
+		return cost
 
 	def connected(self, x0, y0, x1, y1):
-		path = self.__shortestPath(x0, y0, x1, y1)
+		colour = self.getPiece(x0, y0)
 
-		if path == None:
+		if colour == self.__empty_value or self.getPiece(x1, y1) != colour:
 			return False
 
-		return True
+		return self.__find(self.__getIndex(x0, y0)) == self.__find(self.__getIndex(x1, y1))
 
 	def __getColour(self, colour):
-		array = []
-
-		for x in range(self.__board_size):
-			for y in range(self.__board_size):
-				if self.getPiece(x, y) == colour:
-					array.append((x, y))
+		coords, _ = Board.cellTables(self.__board_size)
+		code = self.__codes[colour]
 
-		return array
+		return [coords[i] for i, c in enumerate(self.__board) if c == code]
 	
 	def groupBridges(self, colour):
-		def addToBridgeGroup(found, group):
-			"""
-			"""
-			searched = [] # Instantiate an array of searched nodes (that have been grouped with all possible neighbours).
-
-			while (len(group) > 0):
-				x, y = group.pop(0)
-				for i, j in self.getNeighbours(x, y):
-					if (i, j) in found:
-						found.remove((i, j))
-						group.append((i, j))
-
-				searched.append((x, y))
-
-			return searched, found
-
+		groups = {}
 
-		found = self.__getColour(colour)
-		groups = []
+		for x, y in self.__getColour(colour):
+			groups.setdefault(self.__find(self.__getIndex(x, y)), []).append((x, y))
 
-		while len(found) > 0:
-			group, found = addToBridgeGroup(found, [found.pop(0)])
-			groups.append(group)
-
-		return groups
+		return list(groups.values())
 
 	def isRedWinner(self):
-		groups = self.groupBridges(self.__red_value)
-
-		for group in groups:
-			sideA, sideB = False, False
-
-			for x,_ in group:
-				if x == 0:
-					sideA = True
-
-				elif x == self.__board_size - 1:
-					sideB = True
-
-			if sideA and sideB:
-				return True
-
-		return False
+		side_a, side_b = self.__sides[Board.RED]
+		return self.__find(side_a) == self.__find(side_b)
 
 	def isBlueWinner(self):
-		groups = self.groupBridges(self.__blue_value)
-
-		for group in groups:
-			sideA, sideB = False, False
-
-			for _,y in group:
-				if y == 0:
-					sideA = True
-
-				elif y == self.__board_size - 1:
-					sideB = True
-
-			if sideA and sideB:
-				return True
-
-		return False
+		side_a, side_b = self.__sides[Board.BLUE]
+		return self.__find(side_a) == self.__find(side_b)
 
 	def getWinner(self):
-		if self.isRedWinner():
-			return self.__red_value
-
-		elif self.isBlueWinner():
-			return self.__blue_value
-
-		return self.__empty_value
+		return self.__winner
 
 	def isWinner(self):
 		return not self.getWinner() == self.__empty_value
 
+	def playout(self):
+		"""
+		Plays the rest of the game at random on a copy of the cells: the empty cells are shuffled and taken in turn,
+		starting with the player to move. Hex has no draws, so the full board has exactly one winner, found with one
+		search for a red chain. Returns the winner and the filled cells, as cell codes indexed by y * size + x.
+		"""
+		size = self.__board_size
+		_, neighbours = Board.cellTables(size)
+
+		cells = self.__board[:]
+		empty = self.__empty[:]
+		shuffle(empty)
+
+		first, second = Board.RED, Board.BLUE
+		if not self.red_turn:
+			first, second = second, first
+
+		half = (len(empty) + 1) // 2
+		for i in empty[:half]:
+			cells[i] = first
+		for i in empty[half:]:
+			cells[i] = second
+
+		# Search from the red stones on the x = 0 side for one on the x = size - 1 side.
+		red = Board.RED
+		stack = [i for i in range(0, size ** 2, size) if cells[i] == red]
+		seen = bytearray(size ** 2)
+		for i in stack:
+			seen[i] = 1
+
+		winner = self.__blue_value
+		while stack:
+			i = stack.pop()
+			if i % size == size - 1:
+				winner = self.__red_value
+				break
+
+			for j in neighbours[i]:
+				if not seen[j] and cells[j] == red:
+					seen[j] = 1
+					stack.append(j)
+
+		return winner, cells
+
 	def printBoard(self):
 		s = ""
 		for x in range(self.__board_size):
@@ -247,68 +439,63 @@ class Board:
 	def makeMove(self, move):
 		x, y = move
 
+		merges = len(self.__merges)
+		winner = self.__winner
+
 		if self.red_turn:
 			self.setRedPiece(x, y)
 		else:
 			self.setBluePiece(x, y)
 
+		self.__history.append((self.__getIndex(x, y), merges, winner))
+		self.togglePlayerTurn()
+
+	def undoMove(self):
+		"""Takes back the last move made, emptying its cell and giving the turn back."""
+		index, merges, winner = self.__history.pop()
+		code = self.__board[index]
+
+		self.__unmerge(merges)
+		self.__winner = winner
+
+		self.__board[index] = Board.EMPTY
+		self.__putEmpty(index)
+		self.__hash ^= self.__cell_keys[code][index]
+		self.__rotated_hash ^= self.__cell_keys[code][self.__board_size ** 2 - 1 - index]
+
 		self.togglePlayerTurn()
 
+	def moveCount(self):
+		return len(self.__history)
+
 	def turn(self):
 		if self.red_turn:
 			return self.__red_value
 		return self.__blue_value
 
 	def moves(self):
-		return self.__getColour(self.__empty_value)
+		coords, _ = Board.cellTables(self.__board_size)
+		return [coords[i] for i in self.__empty]
 
-	def copy(self):
-		new_board = Board(self.__board_size)
+	def moveIndices(self):
+		return self.__empty[:]
 
-		for x in range(self.__board_size):
-			for y in range(self.__board_size):
-				colour = self.getPiece(x, y)
-				new_board.__setPiece(x, y, colour)
+	def copy(self):
+		new_board = Board(self.__board_size, self.red_turn)
+
+		new_board.__board = self.__board[:]
+		new_board.__empty = self.__empty[:]
+		new_board.__empty_position = self.__empty_position[:]
+		new_board.__history = self.__history[:]
+		new_board.__hash = self.__hash
+		new_board.__rotated_hash = self.__rotated_hash
+		new_board.__parent = self.__parent[:]
+		new_board.__group_size = self.__group_size[:]
+		new_board.__merges = self.__merges[:]
+		new_board.__winner = self.__winner
 
 		return new_board
 
-class PriorityQueue:
-	def __init__(self, lowest_to_highest=True):
-		self.__score_values = {}
-		self.__scores = []
-		self.__lowest_to_highest = lowest_to_highest
-
-	def add(self, value, score):
-		if score not in self.__scores:
-			self.__score_values[score] = []
-			self.__scores.append(score)
-
-		self.__score_values[score].append(value)
-
-	def pop(self):
-		score = max(self.__scores)
-
-		if self.__lowest_to_highest:
-			score = min(self.__scores)
-
-		values = self.__score_values[score]
-
-		if len(values) == 1:
-			self.__scores.remove(score)
-			self.__score_values.pop(score)
-
-			return values[0]
-
-		value = choice(values)
-		self.__score_values[score].remove(value)
-		return value
-
-	def isEmpty(self):
-		return len(self.__scores) == 0
-	
-	
-
-
 if __name__ == "__main__":
 	board = Board()
 
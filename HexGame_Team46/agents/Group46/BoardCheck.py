@@ -0,0 +1,183 @@
+"""
+Checks the incremental bookkeeping and the path searches of Board against brute force on random games. Run it after
+changing Board:
+
+	python3 agents/Group46/BoardCheck.py
+"""
+from collections import deque
+from math import inf
+from random import Random
+from Board import Board
+
+def bruteWinner(board, colour):
+	# Depth-first search from one side of the colour to the other, over its stones only.
+	size = board.getBoardSize()
+	stones = { (x, y) for x in range(size) for y in range(size) if board.getPiece(x, y) == colour }
+	axis = 0 if colour == board.getRedValue() else 1
+
+	stack = [ cell for cell in stones if cell[axis] == 0 ]
+	seen = set(stack)
+	while stack:
+		cell = stack.pop()
+		if cell[axis] == size - 1:
+			return True
+
+		for neighbour in board.getNeighbours(*cell):
+			if neighbour in stones and neighbour not in seen:
+				seen.add(neighbour)
+				stack.append(neighbour)
+
+	return False
+
+def checkWinners(rng, trials=300):
+	# Plays random games to the end, then undoes them, checking the winner after every move.
+	for _ in range(trials):
+		size = rng.randint(1, 8)
+		board = Board(size)
+		cells = [ (x, y) for x in range(size) for y in range(size) ]
+		rng.shuffle(cells)
+
+		states = []
+		for move in cells:
+			states.append((board.getHash(), board.getWinner(), board.red_turn))
+			board.makeMove(move)
+
+			red = bruteWinner(board, board.getRedValue())
+			blue = bruteWinner(board, board.getBlueValue())
+			assert board.isRedWinner() == red and board.isBlueWinner() == blue, (size, move)
+			assert (board.getWinner() != board.getEmptyValue()) == (red or blue), (size, move)
+
+			if rng.random() < 0.3:
+				copy = board.copy()
+				assert copy.isRedWinner() == red and copy.getWinner() == board.getWinner(), (size, move)
+
+		for state in reversed(states):
+			board.undoMove()
+			assert (board.getHash(), board.getWinner(), board.red_turn) == state, size
+			assert board.isRedWinner() == bruteWinner(board, board.getRedValue()), size
+			assert board.isBlueWinner() == bruteWinner(board, board.getBlueValue()), size
+
+		assert board.moveCount() == 0, size
+
+def checkMoves(rng, trials=200):
+	# Checks the list of empty cells as moves are made, undone and made again.
+	for _ in range(trials):
+		size = rng.randint(1, 8)
+		board = Board(size)
+		cells = [ (x, y) for x in range(size) for y in range(size) ]
+		rng.shuffle(cells)
+
+		for move in cells:
+			board.makeMove(move)
+			if rng.random() < 0.3:
+				board.undoMove()
+				board.makeMove(move)
+
+			empty = { (x, y) for x, y in cells if board.isEmpty(x, y) }
+			moves = board.moves()
+			assert set(moves) == empty and len(moves) == len(empty), (size, move)
+
+			copy = board.copy()
+			assert set(copy.moves()) == empty and copy.getHash() == board.getHash(), (size, move)
+
+		try:
+			board.getPiece(size, 0)
+			assert False, "getPiece accepted a cell off the board"
+		except IndexError:
+			pass
+
+def bfsPath(board, start, end, through_empty):
+	# Breadth-first search for the fewest steps from start to end, over stones of the start colour and, if asked, empty
+	# cells.
+	colour = board.getPiece(*start)
+	steps = { start: 0 }
+	queue = deque([start])
+	while queue:
+		cell = queue.popleft()
+		if cell == end:
+			return steps[cell]
+
+		for neighbour in board.getNeighbours(*cell):
+			value = board.getPiece(*neighbour)
+			if neighbour not in steps and (value == colour or (through_empty and value == board.getEmptyValue())):
+				steps[neighbour] = steps[cell] + 1
+				queue.append(neighbour)
+
+	return None
+
+def bfsConnection(board, colour):
+	# 0-1 breadth-first search from one side of the colour to the other, where own stones are free and empty cells cost
+	# one. None if the other colour has cut the sides apart.
+	size = board.getBoardSize()
+	axis = 0 if colour == board.getRedValue() else 1
+	empty = board.getEmptyValue()
+
+	cost = {}
+	queue = deque()
+	for cell in [ (0, i) if axis == 0 else (i, 0) for i in range(size) ]:
+		value = board.getPiece(*cell)
+		if value == colour:
+			cost[cell] = 0
+			queue.appendleft(cell)
+		elif value == empty:
+			cost[cell] = 1
+			queue.append(cell)
+
+	while queue:
+		cell = queue.popleft()
+		for neighbour in board.getNeighbours(*cell):
+			value = board.getPiece(*neighbour)
+			if value != colour and value != empty:
+				continue
+
+			step = 0 if value == colour else 1
+			if cost[cell] + step < cost.get(neighbour, inf):
+				cost[neighbour] = cost[cell] + step
+				if step == 0:
+					queue.appendleft(neighbour)
+				else:
+					queue.append(neighbour)
+
+	costs = [ c for cell, c in cost.items() if cell[axis] == size - 1 ]
+	return min(costs) if costs else None
+
+def checkPaths(rng, trials=400):
+	# Compares the A* searches of shortestPath and connectionDistance with breadth-first search on random positions.
+	for _ in range(trials):
+		size = rng.randint(1, 9)
+		board = Board(size)
+		cells = [ (x, y) for x in range(size) for y in range(size) ]
+		rng.shuffle(cells)
+		for move in cells[:rng.randint(0, len(cells))]:
+			board.makeMove(move)
+
+		for _ in range(5):
+			start, end = rng.choice(cells), rng.choice(cells)
+			for through_empty in (False, True):
+				path = board.shortestPath(*start, *end, empty_cost=1 if through_empty else None)
+
+				reachable = board.getPiece(*end) == board.getPiece(*start) or \
+					(through_empty and board.getPiece(*end) == board.getEmptyValue())
+				steps = bfsPath(board, start, end, through_empty) if reachable else None
+
+				if steps is None:
+					assert path is None, (size, start, end, path)
+					continue
+
+				assert path is not None and len(path) - 1 == steps, (size, start, end, path, steps)
+				assert path[0] == start and path[-1] == end, (size, start, end, path)
+				for a, b in zip(path, path[1:]):
+					assert b in board.getNeighbours(*a), (size, path)
+
+		for colour in (board.getRedValue(), board.getBlueValue()):
+			assert board.connectionDistance(colour) == bfsConnection(board, colour), (size, colour)
+
+		if board.isRedWinner():
+			assert board.connectionDistance(board.getRedValue()) == 0, size
+
+if __name__ == "__main__":
+	rng = Random(46)
+	checkWinners(rng)
+	checkMoves(rng)
+	checkPaths(rng)
+	print("Board checks passed")
@@ -1,31 +1,86 @@
 import math, Board
-from random import choice
+from array import array
+from random import choice, shuffle
 from time import time
 
-class MCTSNode:
-	def __init__(self, default_outcome, move=None, parent=None):
-		self.move = move
-		self.parent = parent
-		self.visits = 0
-		self.q_value = 0
-		self.q_rave = 0
-		self.visits_rave = 0
-		self.children = {}
-		self.outcome = default_outcome
-
-	def addChildren(self, children):
-		for child in children:
-			self.children[child.move] = child
-
-	def value(self, explore, crit):
-		if self.visits == 0:
-			if explore == 0:
-				return 0
+class NodePool:
+	"""
+	The nodes of a search tree, stored as columns of integers indexed by node id. The children of a node sit next to
+	each other, from first_child to first_child + child_count; first_child is -1 for a leaf. move is the board index
+	of the move leading to a node, and parent is -1 for the root. The columns grow by doubling up to limit nodes.
+	"""
+	COLUMNS = ('visits', 'q_value', 'visits_rave', 'q_rave', 'parent', 'first_child', 'child_count', 'move')
+
+	def __init__(self, capacity=4096, limit=2 ** 21):
+		self.capacity = capacity
+		self.limit = limit
+		self.size = 0
+
+		for name in NodePool.COLUMNS:
+			setattr(self, name, array('i', [0]) * capacity)
+
+	def __grow(self, size):
+		while self.capacity < size:
+			extra = min(self.capacity, self.limit - self.capacity)
+			for name in NodePool.COLUMNS:
+				getattr(self, name).extend(array('i', [0]) * extra)
+			self.capacity += extra
+
+	def addNodes(self, parent, moves):
+		"""Adds a node for each move as the children of parent. Returns the id of the first, or -1 if there are no moves or the pool is full."""
+		count = len(moves)
+		first = self.size
+		end = first + count
+		if count == 0 or end > self.limit:
+			return -1
+
+		self.__grow(end)
+
+		zeros = array('i', [0]) * count
+		self.visits[first:end] = zeros
+		self.q_value[first:end] = zeros
+		self.visits_rave[first:end] = zeros
+		self.q_rave[first:end] = zeros
+		self.child_count[first:end] = zeros
+		self.first_child[first:end] = array('i', [-1]) * count
+		self.parent[first:end] = array('i', [parent]) * count
+		self.move[first:end] = array('i', moves)
+
+		if parent >= 0:
+			self.first_child[parent] = first
+			self.child_count[parent] = count
+
+		self.size = end
+		return first
+
+	def subtree(self, root):
+		"""Returns a new pool with only the subtree under root, which becomes node 0."""
+		# Old ids in breadth-first order, which keeps every block of children together.
+		ids = array('i', [root])
+		parents = array('i', [-1])
+		firsts = array('i')
+
+		i = 0
+		while i < len(ids):
+			first = self.first_child[ids[i]]
+			if first >= 0:
+				count = self.child_count[ids[i]]
+				firsts.append(len(ids))
+				ids.extend(range(first, first + count))
+				parents.extend(array('i', [i]) * count)
 			else:
-				return math.inf
+				firsts.append(-1)
+			i += 1
 
-		alpha = max(0, (crit - self.visits) / crit)
-		return self.q_value * (1 - alpha) / self.visits + self.q_rave * alpha / self.visits_rave
+		pool = NodePool(max(len(ids), 4096), self.limit)
+		pool.size = len(ids)
+		pool.parent[:len(ids)] = parents
+		pool.first_child[:len(ids)] = firsts
+		for name in ('visits', 'q_value', 'visits_rave', 'q_rave', 'child_count', 'move'):
+			column = getattr(self, name)
+			getattr(pool, name)[:len(ids)] = array('i', map(column.__getitem__, ids))
+
+		return pool
 
 
 class MCTS:
@@ -34,144 +89,180 @@ class MCTS:
 
 	def __init__(self, board):
 		self.board = board.copy()
-		self.root = self.newNode()
+		self.newTree()
 
-	def newNode(self, move=None, parent=None):
-		return MCTSNode(self.board.getEmptyValue(), move, parent)
+	def newTree(self):
+		self.tree = NodePool()
+		self.root = self.tree.addNodes(-1, [-1])
+		self.depth = 0
 
 	def bestMove(self):
-		children = self.root.children.values()
+		tree = self.tree
+		first = tree.first_child[self.root]
+		children = range(first, first + tree.child_count[self.root])
 
-		max_value = max(children, key = lambda n: n.visits).visits
-		max_nodes = [n for n in children if n.visits == max_value]
+		max_value = max(tree.visits[n] for n in children)
+		max_nodes = [n for n in children if tree.visits[n] == max_value]
 
 		best_child = choice(max_nodes)
 
-		return best_child.move
+		coords, _ = Board.Board.cellTables(self.board.getBoardSize())
+		return coords[tree.move[best_child]]
 
 	def makeMove(self, move):
-		if move in self.root.children:
-			child = self.root.children[move]
-			child.parent = None
-			self.root = child
-			self.board.makeMove(child.move)
-			return
-
+		tree = self.tree
+		index = self.board.getIndex(*move)
 		self.board.makeMove(move)
-		self.root = self.newNode()
+
+		first = tree.first_child[self.root]
+		if first >= 0:
+			for child in range(first, first + tree.child_count[self.root]):
+				if tree.move[child] == index:
+					# Keep what was searched below the move, and let the rest of the tree go.
+					self.tree = tree.subtree(child)
+					self.root = 0
+					return
+
+		self.newTree()
 
 	def search(self, time_budget):
+		"""Searches for the given number of seconds. Returns the number of rollouts, the size and depth of the tree, and the rollouts per second."""
 		start_time = time()
 		num_rollouts = 0
+		self.depth = 0
 
 		while time() - start_time < time_budget:
+			move_count = self.board.moveCount()
 			node, state = self.select_node()
 			turn = state.turn()
-			outcome, red_rave_pts, blue_rave_pts = self.roll_out(state)
-			self.backup(node, turn, outcome, red_rave_pts, blue_rave_pts)
+			outcome, cells = self.roll_out(state)
+
+			# Take back the moves made on the way down the tree.
+			while self.board.moveCount() > move_count:
+				self.board.undoMove()
+
+			self.backup(node, turn, outcome, cells)
 			num_rollouts += 1
-			
+
+		rate = num_rollouts / max(time() - start_time, 1e-9)
 		count, depth = self.treeSize()
-		return num_rollouts, count, depth
+		return num_rollouts, count, depth, rate
 
 	def select_node(self):
-		node = self.root
-		state = self.board.copy()
+		# The moves are made on the search board itself, and undone by the caller.
+		tree = self.tree
+		visits, q_value, visits_rave, q_rave = tree.visits, tree.q_value, tree.visits_rave, tree.q_rave
+		first_child, child_count, moves = tree.first_child, tree.child_count, tree.move
+		coords, _ = Board.Board.cellTables(self.board.getBoardSize())
+
+		# The value of each child is the mean reward, mixed with the RAVE mean while it has fewer than crit visits.
+		crit = self.RAVE_CONST
+		unvisited = 0 if self.EXPL_CONST == 0 else math.inf
 
-		while len(node.children) > 0:
-			children = node.children.values()
+		node = self.root
+		state = self.board
+		depth = 0
+
+		while first_child[node] >= 0:
+			first = first_child[node]
+			end = first + child_count[node]
+
+			# Children are stored in random order, so the first unvisited one is a random pick among them.
+			if unvisited == math.inf and 0 in visits[first:end]:
+				node = first + visits[first:end].index(0)
+				state.makeMove(coords[moves[node]])
+				depth += 1
+				break
+
+			max_value = -math.inf
+			max_nodes = []
+
+			for child in range(first, end):
+				n = visits[child]
+				if n == 0:
+					value = unvisited
+				elif n >= crit:
+					value = q_value[child] / n
+				else:
+					alpha = (crit - n) / crit
+					value = q_value[child] * (1 - alpha) / n + q_rave[child] * alpha / visits_rave[child]
+
+				if value > max_value:
+					max_value = value
+					max_nodes = [child]
+				elif value == max_value:
+					max_nodes.append(child)
 
-			max_value = max(children, key = lambda n: n.value(self.EXPL_CONST, self.RAVE_CONST)).value(self.EXPL_CONST, self.RAVE_CONST)
-			max_nodes = [n for n in children if n.value(self.EXPL_CONST, self.RAVE_CONST) == max_value]
 			node = choice(max_nodes)
-			state.makeMove(node.move)
+			state.makeMove(coords[moves[node]])
+			depth += 1
 
-			if node.visits == 0:
-				return (node, state)
+			if visits[node] == 0:
+				break
 
-		if self.expand(node, state):
-			node = choice(list(node.children.values()))
-			state.makeMove(node.move)
+		else:
+			if self.expand(node, state):
+				node = first_child[node]
+				state.makeMove(coords[moves[node]])
+				depth += 1
 
+		self.depth = max(self.depth, depth)
 		return (node, state)
 
 	def roll_out(self, state):
-		moves = state.moves()
-
-		red_rave_pts = []
-		blue_rave_pts = []
-
-		for x in range(state.getBoardSize()):
-			for y in range(state.getBoardSize()):
-				if state.isRed(x, y):
-					red_rave_pts.append((x, y))
-				elif state.isBlue(x, y):
-					blue_rave_pts.append((x, y))
+		# Play the game out at random; the RAVE points are the cells each colour holds at the end.
+		return state.playout()
 
-		return state.getWinner(), red_rave_pts, blue_rave_pts
+	def backup(self, node, turn, outcome, cells):
+		tree = self.tree
+		visits, q_value, visits_rave, q_rave = tree.visits, tree.q_value, tree.visits_rave, tree.q_rave
+		first_child, child_count, moves, parent = tree.first_child, tree.child_count, tree.move, tree.parent
 
-	def backup(self, node, turn, outcome, red_rave_pts, blue_rave_pts):
+		# The RAVE update looks at every child of every node on the path, as selection does on the way down, so both
+		# cost O(depth * moves) per rollout. Together they bound the search at about 2-3k rollouts/s on 11x11.
 		reward = -1 if outcome == turn else 1
-
-		while node != None:
-			if turn == self.board.getRedValue():
-				for point in red_rave_pts:
-					if point in node.children:
-						node.children[point].q_rave -= reward
-						node.children[point].visits_rave += 1
-
-			else:
-				for point in blue_rave_pts:
-					if point in node.children:
-						node.children[point].q_rave -= reward
-						node.children[point].visits_rave += 1
-
-			node.visits += 1
-			node.q_value += reward
-
-			if turn == self.board.getRedValue():
-				turn = self.board.getBlueValue()
+		colour = Board.Board.RED if turn == self.board.getRedValue() else Board.Board.BLUE
+
+		while node != -1:
+			# Children whose cell the player to move held at the end of the playout.
+			first = first_child[node]
+			if first >= 0:
+				for child in range(first, first + child_count[node]):
+					if cells[moves[child]] == colour:
+						q_rave[child] -= reward
+						visits_rave[child] += 1
+
+			visits[node] += 1
+			q_value[node] += reward
+
+			if colour == Board.Board.RED:
+				colour = Board.Board.BLUE
 			else:
-				turn = self.board.getRedValue()
+				colour = Board.Board.RED
 
 			reward = -reward
-			node = node.parent
+			node = parent[node]
 
 	def expand(self, parent, state):
-		children = []
 		if state.isWinner():
 			return False
 
-		for move in state.moves():
-			children.append(self.newNode(move, parent))
+		# Shuffled, so that children can be tried in the order they are stored.
+		moves = state.moveIndices()
+		shuffle(moves)
 
-		parent.addChildren(children)
-		return True
+		return self.tree.addNodes(parent, moves) >= 0
 
 	def swap(self):
-		self.board.togglePlayerTurn()
+		# The pie rule only changes which agent plays which colour. The stones stay and blue still moves next, so the
+		# board and the tree are kept as they are.
+		pass
 
 	def setGamestate(self, state):
 		self.board = state.copy()
-		self.root = self.newNode()
+		self.newTree()
 
 	def treeSize(self):
-		q = []
-		count = 0
-		q.append((self.root, 1))
-
-		max_depth = 0
-
-		while len(q) > 0:
-			node, depth = q.pop(0)
-			count += 1
-
-			if max_depth < depth:
-				max_depth = depth
-
-			children = node.children.values()
-
-			for child in children:
-				q.append((child, depth + 1))
-
-		return count, depth
\ No newline at end of file
+		# Every node in the pool is in the tree, as the pool is rebuilt when the root moves. The depth is the deepest
+		# node reached by the last search.
+		return self.tree.size, self.depth
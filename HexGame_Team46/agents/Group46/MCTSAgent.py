@@ -1,15 +1,20 @@
-import socket
+import os
+import sys
 from MCTS import MCTS
 from Board import Board
 from random import choice
+from sys import stderr
+
+# appended, so that Board above is still the one next to this file
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
+from LineReader import LineReader
+from Transport import Transport
 
 class MCTSAgent:
     """This class describes base hex agent. It will randomly send a
     valid move at each turn, and it will choose to swap with a 50% chance.
     """
 
-    HOST = "127.0.0.1"
-    PORT = 1234
 
     def run(self):
         """A finite-state machine that cycles through waiting for input
@@ -29,6 +34,11 @@ class MCTSAgent:
 
         self._colour = ""
         self._turn_count = 1
+
+        # Time controls in milliseconds, if the engine sends them.
+        self._clock = None
+        self._increment = 0
+        self._move_limit = None
         
         states = {
             1: MCTSAgent._connect,
@@ -47,8 +57,15 @@ class MCTSAgent:
         message.
         """
         
-        self._s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self._s.connect((MCTSAgent.HOST, MCTSAgent.PORT))
+        self._s = Transport.connect()
+
+        # identifies the agent when the engine hosts several games
+        token = os.environ.get("HEX_TOKEN")
+        if (token is not None):
+            self._s.sendall(bytes(f"HELLO;{token}\n", "utf-8"))
+
+        # buffered reader that returns one whole message at a time
+        self._reader = LineReader(self._s)
 
         return 2
 
@@ -57,11 +74,18 @@ class MCTSAgent:
         answers if it is Red or waits if it is Blue.
         """
         
-        data = self._s.recv(1024).decode("utf-8").strip().split(";")
+        data = self._reader.read_message().strip().split(";")
         if (data[0] == "START"):
             self._board_size = int(data[1])
             self._colour = data[2]
 
+            # Read the time control, if there is one.
+            if (len(data) > 3):
+                total, increment, limit = data[3].split(",")
+                self._clock = int(total)
+                self._increment = int(increment)
+                self._move_limit = int(limit) or None
+
             # Instantiate a new MCTS containing a new board.
             self.mcts = MCTS(Board(size=self._board_size))
 
@@ -85,21 +109,43 @@ class MCTSAgent:
         # Use a default time of 2 seconds.
         time = 2
 
+        # Share out the clock if the engine sends it.
+        if self._clock is not None:
+            time = self._time_budget()
+
         # Use 10 seconds for the first 15 moves.
-        if self._turn_count < 30:
+        elif self._turn_count < 30:
             time = 10
 
         # Use 5 seconds for the second set of 15 moves.
         elif self._turn_count < 60:
             time = 5
 
-        # Search the MCTS tree.
-        self.mcts.search(time)
+        # Search the MCTS tree and report how fast it went.
+        rollouts, nodes, depth, rate = self.mcts.search(time)
+        print(
+            f"{rollouts} rollouts in {time:.2f}s ({rate:.0f}/s), " +
+            f"tree of {nodes} nodes and depth {depth}",
+            file=stderr
+        )
 
         # Find the best move.
         coords = self.mcts.bestMove()
         return self._make_move_coords(coords)
 
+    def _time_budget(self):
+        """Returns the seconds to search for: an even share of the time
+        left over the moves this agent may still have to make, plus the
+        increment, with a margin for the messages.
+        """
+
+        moves_left = max((self._board_size ** 2 - self._turn_count) // 2, 1)
+        budget = self._clock / moves_left + self._increment
+        if self._move_limit is not None:
+            budget = min(budget, self._move_limit)
+
+        return max(budget * 0.9 / 1000 - 0.05, 0.01)
+
     def _make_move_coords(self, coords):
         """Makes a move at the specified coordinates.
         """
@@ -120,8 +166,8 @@ class MCTSAgent:
 
         self._turn_count += 1
 
-        data = self._s.recv(1024).decode("utf-8").strip().split(";")
-        if (data[0] == "END" or data[-1] == "END"):
+        data = self._reader.read_message().strip().split(";")
+        if (data[0] == "END" or data[3] == "END"):
             return 5
         else:
 
@@ -139,7 +185,15 @@ class MCTSAgent:
                 self.mcts.makeMove(coords)
                     
 
-            if (data[-1] == self._colour):
+            # Read our clock, sent after the next player.
+            if (len(data) > 4):
+                clocks = data[4].split(",")
+                if self._colour == self._red_value:
+                    self._clock = int(clocks[0])
+                else:
+                    self._clock = int(clocks[1])
+
+            if (data[3] == self._colour):
                 return 3
 
         return 4
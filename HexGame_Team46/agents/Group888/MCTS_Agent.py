@@ -1,4 +1,3 @@
-import socket
 from random import choice
 from time import sleep
 
@@ -6,7 +5,9 @@ from mcts_ucb import Node, MCTS_Player
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
-from Board import Board
+from BitBoard import BitBoard as Board
+from LineReader import LineReader
+from Transport import Transport
 
 
 class MCTS_Agent():
@@ -14,9 +15,6 @@ class MCTS_Agent():
     valid move at each turn, and it will choose to swap with a 50% chance.
     """
 
-    HOST = "127.0.0.1"
-    PORT = 1234
-
     def run(self):
         """A finite-state machine that cycles through waiting for input
         and sending moves.
@@ -46,8 +44,15 @@ class MCTS_Agent():
         message.
         """
         
-        self._s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self._s.connect((MCTS_Agent.HOST, MCTS_Agent.PORT))
+        self._s = Transport.connect()
+
+        # identifies the agent when the engine hosts several games
+        token = os.environ.get("HEX_TOKEN")
+        if (token is not None):
+            self._s.sendall(bytes(f"HELLO;{token}\n", "utf-8"))
+
+        # buffered reader that returns one whole message at a time
+        self._reader = LineReader(self._s)
 
         return 2
 
@@ -56,7 +61,7 @@ class MCTS_Agent():
         answers if it is Red or waits if it is Blue.
         """
         
-        data = self._s.recv(1024).decode("utf-8").strip().split(";")
+        data = self._reader.read_message().strip().split(";")
 
         if (data[0] == "START"):
 
@@ -66,6 +71,7 @@ class MCTS_Agent():
                     self._choices.append((i, j))
                     
             self._colour = data[2]
+            self._board = Board(self._board_size)
 
             if (self._colour == "R"):
                 return 3
@@ -89,10 +95,6 @@ class MCTS_Agent():
         if (self._turn_count == 2 and choice([0, 1]) == 1):
             msg = "SWAP\n"
 
-        if(self._turn_count == 1):
-            # move = (5,7)
-            self._board = Board(11)
-
         root = Node(self._board,None,None,self._colour)
         ai = MCTS_Player(self._colour)
         move = ai.search(150,root)
@@ -107,12 +109,13 @@ class MCTS_Agent():
 
         self._turn_count += 1
 
-        data = self._s.recv(1024).decode("utf-8").strip().split(";")
-        if (data[0] == "END" or data[-1] == "END"):
+        message = self._reader.read_message().strip()
+        data = message.split(";")
+        if (data[0] == "END" or data[3] == "END"):
             return 5
         else:
-            board = data[2]
-            self._board = Board.from_string(board, bnf=True)
+            # only the moved tile is read from the message
+            self._board.apply_change(message)
 
             if (data[1] == "SWAP"):
                 self._colour = self.opp_colour()
@@ -120,7 +123,7 @@ class MCTS_Agent():
                 x, y = data[1].split(",")
                 self._choices.remove((int(x), int(y)))
 
-            if (data[-1] == self._colour):
+            if (data[3] == self._colour):
                 return 3
 
         return 4
@@ -2,7 +2,9 @@ import math, random
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
-from Board import Board
+# BitBoard copies in O(1); "from Board import Board" also works here
+from BitBoard import BitBoard as Board
+from Colour import Colour
 
 class Node:
     def __init__(self, board, parent=None, action=None, color="R"):
@@ -124,13 +126,11 @@ def available(board):
     """
     choose available moves from a board
     """
-    tiles = board.get_tiles()
+    size = board.get_size()
     available = []
-    for tt in tiles:
-        for t in tt:
-            if (t.get_colour()==None):
-                x = t.get_x()
-                y = t.get_y()
+    for x in range(size):
+        for y in range(size):
+            if (board.get_tile_colour(x, y) == None):
                 available.append((x,y))
     return available
 
@@ -138,12 +138,7 @@ def move(board, player, move):
     """
     make a move and return a board
     """
-    str = board.print_board()
     (x,y) = move
-    ss = str.split(",")
-    s = ss[x] 
-    s = s[:y] + player + s[y+1:]
-    ss[x] = s
-    ss = ','.join(ss)
-    board = Board.from_string(ss)
+    board = board.copy()
+    board.set_tile_colour(x, y, Colour.from_char(player))
     return board
\ No newline at end of file
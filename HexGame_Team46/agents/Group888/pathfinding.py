@@ -1,28 +1,37 @@
-import socket
+import os
+import sys
 from random import choice
 from time import sleep
 import numpy as np
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src'))
+from LineReader import LineReader
+from Transport import Transport
+
 
 class NaiveAgent():
     """This class describes the default Hex agent. It will randomly send a
     valid move at each turn, and it will choose to swap with a 50% chance.
     """
 
-    HOST = "127.0.0.1"
-    PORT = 1234
-
     def __init__(self, board_size=11):
-        self.s = socket.socket(
-            socket.AF_INET, socket.SOCK_STREAM
-        )
+        self.s = Transport.connect()
 
-        self.s.connect((self.HOST, self.PORT))
+        # identifies the agent when the engine hosts several games
+        token = os.environ.get("HEX_TOKEN")
+        if (token is not None):
+            self.s.sendall(bytes(f"HELLO;{token}\n", "utf-8"))
+
+        # buffered reader that returns one whole message at a time
+        self.reader = LineReader(self.s)
 
         self.board_size = board_size
         self.board = []
         self.colour = ""
         self.turn_count = 0
 
+        # the engine may start another game on this connection
+        self.persistent = os.environ.get("HEX_NEWGAME") == "1"
+
         # self.startWeights = [
         #                     [0,0,0,1,1,1,2,2,3,4,4],
         #                     [0,1,2,3,4,5,5,5,5,5,4],
@@ -41,10 +50,10 @@ class NaiveAgent():
         """Reads data until it receives an END message or the socket closes."""
 
         while True:
-            data = self.s.recv(1024)
+            data = self.reader.read_message()
             if not data:
                 break
-            # print(f"{self.colour} {data.decode('utf-8')}", end="")
+            # print(f"{self.colour} {data}")
             if (self.interpret_data(data)):
                 break
 
@@ -55,13 +64,14 @@ class NaiveAgent():
         if the game ended, False otherwise.
         """
 
-        messages = data.decode("utf-8").strip().split("\n")
+        messages = data.strip().split("\n")
         messages = [x.split(";") for x in messages]
         # print(messages)
         for s in messages:
             if s[0] == "START":
                 self.board_size = int(s[1])
                 self.colour = s[2]
+                self.turn_count = 0
                 self.board = [
                     [0]*self.board_size for i in range(self.board_size)]
 
@@ -69,11 +79,16 @@ class NaiveAgent():
                     self.make_move()
 
             elif s[0] == "END":
+                if self.persistent:
+                    # ready for the next START on this connection
+                    self.s.sendall(bytes("NEWGAME\n", "utf-8"))
+                    return False
                 return True
 
             elif s[0] == "CHANGE":
                 if s[3] == "END":
-                    return True
+                    # a persistent agent waits for END instead
+                    return not self.persistent
 
                 elif s[1] == "SWAP":
                     self.colour = self.opp_colour()
@@ -0,0 +1,62 @@
+from random import choice
+
+
+class Agent():
+    """Base class for agents that the engine calls directly, in the same
+    process, instead of talking to them over a socket.
+
+    The engine calls start once, then on_change after every move (its own
+    and the opponent's), choose_move whenever it is the agent's turn and
+    end when the match is over. Colours are given as their protocol
+    characters, "R" or "B".
+    """
+
+    def start(self, board_size, colour, time_control=None):
+        """Called when the match starts, like the START message. If the
+        engine sends clocks, time_control is the time limit, increment and
+        move time limit in milliseconds, and the argument is left out
+        otherwise.
+        """
+        pass
+
+    def on_change(self, move, board, next_player, clocks=None):
+        """Called after every move, like the CHANGE message. move is an
+        (x, y) tuple or "SWAP", board is the protocol board string and
+        next_player is "R", "B" or "END". If the engine sends clocks,
+        clocks is the time Red and Blue have left in milliseconds, and the
+        argument is left out otherwise.
+        """
+        pass
+
+    def choose_move(self, time_left):
+        """Returns the agent's move as an (x, y) tuple or "SWAP". A string
+        is sent to the engine as if the agent had written it to the socket.
+        time_left is the agent's remaining time in nanoseconds.
+        """
+        raise NotImplementedError()
+
+    def end(self, winner):
+        """Called when the match is over, like the END message. winner is
+        "R", "B" or "None".
+        """
+        pass
+
+    def close(self, kill=True):
+        """Called when the engine closes the match."""
+        pass
+
+
+class RandomAgent(Agent):
+    """In-process agent that plays a random empty tile and never swaps."""
+
+    def start(self, board_size, colour, time_control=None):
+        self._choices = [
+            (x, y) for x in range(board_size) for y in range(board_size)
+        ]
+
+    def on_change(self, move, board, next_player, clocks=None):
+        if (move != "SWAP"):
+            self._choices.remove(move)
+
+    def choose_move(self, time_left):
+        return choice(self._choices)
@@ -0,0 +1,118 @@
+import os
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+
+class AgentLimits():
+    """Resource limits for agent processes, so that agents playing at the
+    same time do not slow each other down.
+
+    cpus is a list of the CPU ids agents may run on. It is split into
+    groups of cpus_per_agent, and each new agent is pinned to the next
+    group in turn. memory caps the address space of each agent in bytes,
+    and cpu_time its CPU time in seconds; the OS kills an agent that goes
+    over, which the engine sees as a timeout. None disables a limit. The
+    limits need Linux.
+    """
+
+    def __init__(self, cpus=None, cpus_per_agent=1, memory=None,
+                 cpu_time=None):
+        super().__init__()
+
+        self.cpus = cpus
+        self.cpus_per_agent = cpus_per_agent
+        self.memory = memory
+        self.cpu_time = cpu_time
+        self._next = 0
+
+    def next_cpus(self):
+        """Returns the next group of CPUs to pin an agent to, or None."""
+
+        if (not self.cpus):
+            return None
+
+        groups = max(len(self.cpus) // self.cpus_per_agent, 1)
+        start = (self._next % groups) * self.cpus_per_agent
+        self._next += 1
+        return set(self.cpus[start:start + self.cpus_per_agent])
+
+    def preexec(self):
+        """Returns a function for the preexec_fn of Popen that applies the
+        limits to the next agent started.
+        """
+
+        cpus = self.next_cpus()
+        memory = self.memory
+        cpu_time = self.cpu_time
+
+        def apply():
+            if (cpus is not None):
+                os.sched_setaffinity(0, cpus)
+            if (memory is not None):
+                resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+            if (cpu_time is not None):
+                resource.setrlimit(
+                    resource.RLIMIT_CPU, (cpu_time, cpu_time + 1)
+                )
+
+        return apply
+
+    @staticmethod
+    def get_cpu_time(process):
+        """Returns the CPU time a running process has used so far in
+        nanoseconds, or None if it cannot be read. The scheduler statistics
+        of its threads are used if the kernel has them, as they count
+        nanoseconds where utime and stime only count clock ticks.
+        """
+
+        cpu_time = AgentLimits._read_schedstat(process.pid)
+        if (cpu_time is not None):
+            return cpu_time
+
+        try:
+            with open(f"/proc/{process.pid}/stat") as f:
+                fields = f.read().rpartition(")")[2].split()
+        except OSError:
+            return None
+
+        # utime and stime, the 14th and 15th fields, in clock ticks
+        ticks = int(fields[11]) + int(fields[12])
+        return ticks * 10**9 // os.sysconf("SC_CLK_TCK")
+
+    @staticmethod
+    def _read_schedstat(pid):
+        """Returns the time every running thread of the process has spent
+        on a CPU in nanoseconds, or None if it cannot be read.
+        """
+
+        try:
+            threads = os.listdir(f"/proc/{pid}/task")
+        except OSError:
+            return None
+
+        total = 0
+        for thread in threads:
+            try:
+                with open(f"/proc/{pid}/task/{thread}/schedstat") as f:
+                    total += int(f.read().split()[0])
+            except OSError:
+                # a thread that has just ended can be skipped, but without
+                # the main thread there is nothing to go on
+                if (thread == str(pid)):
+                    return None
+
+        return total
+
+    @staticmethod
+    def cpu_since(cpu_time, cpu_start):
+        """Returns the CPU time used since cpu_start, or None if either
+        is not known.
+        """
+
+        if (cpu_time is None or cpu_start is None):
+            return None
+        return cpu_time - cpu_start
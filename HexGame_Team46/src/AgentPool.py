@@ -0,0 +1,63 @@
+class AgentPool():
+    """Keeps agent processes connected between games, so that agents which
+    are slow to start only start once.
+
+    Agents started for a pool get HEX_NEWGAME=1 in their environment. An
+    agent that supports it answers the END message with NEWGAME and then
+    waits for the next START on the same connection. Agents that do not
+    answer in time are closed as usual, and a new process is started for
+    their next game.
+    """
+
+    # time an agent has to answer END with NEWGAME, in nanoseconds
+    NEWGAME_TIMEOUT = 10**9
+
+    def __init__(self):
+        super().__init__()
+
+        self._idle = {}  # run string: list of idle agents
+
+    def take(self, run_s):
+        """Returns an idle agent started with the given run string, as a
+        dict with its 'thread', 'conn', 'addr' and 'reader', or None if
+        there is none.
+        """
+
+        idle = self._idle.get(run_s, [])
+        while (len(idle) > 0):
+            agent = idle.pop()
+            if (agent['thread'].poll() is None):
+                return agent
+            agent['conn'].close()
+        return None
+
+    def release(self, run_s, agent):
+        """Waits for the agent to ask for a new game. Returns True if it
+        did and was kept in the pool, False if it has to be closed.
+        """
+
+        try:
+            answer = agent['reader'].read_message(AgentPool.NEWGAME_TIMEOUT)
+        except Exception:
+            return False
+
+        if (answer.strip() != "NEWGAME"):
+            return False
+
+        self._idle.setdefault(run_s, []).append({
+            'thread': agent['thread'],
+            'conn': agent['conn'],
+            'addr': agent['addr'],
+            'reader': agent['reader']
+        })
+        return True
+
+    def close(self):
+        """Closes every idle agent."""
+
+        for agents in self._idle.values():
+            for agent in agents:
+                agent['conn'].close()
+                agent['thread'].kill()
+                agent['thread'].wait()
+        self._idle = {}
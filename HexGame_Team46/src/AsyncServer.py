@@ -0,0 +1,395 @@
+import asyncio
+import os
+import secrets
+import shlex
+import subprocess
+from sys import platform
+from time import time_ns
+
+from AgentLimits import AgentLimits
+from Colour import Colour
+from EndState import EndState
+from Game import Game
+from Protocol import Protocol
+
+
+class AsyncServer():
+    """Hosts many matches at once on one event loop and one listening
+    socket.
+
+    Every agent is started with the server port in HEX_PORT and a token of
+    its own in HEX_TOKEN. Its first message must be HELLO;token, which
+    tells the server which match and colour the connection belongs to.
+    Agents are waited on with event loop timers instead of blocking reads,
+    so one process can keep the clocks of every match running. limits, an
+    AgentLimits, is applied to every agent started.
+    """
+
+    # seconds a new connection has to identify itself
+    HELLO_TIMEOUT = 10
+
+    def __init__(self, host=Protocol.HOST, port=0, limits=None):
+        super().__init__()
+
+        self._host = host
+        self._port = port
+        self._limits = limits
+        self._server = None
+        self._pending = {}  # token: future of the agent's connection
+        self.port = None
+
+    async def start(self):
+        """Starts listening. A port of 0 lets the OS pick a free one."""
+
+        self._server = await asyncio.start_server(
+            self._identify, self._host, self._port,
+            limit=Protocol.MAX_MESSAGE_LENGTH
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """Stops listening. Matches still running are not affected."""
+
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _identify(self, reader, writer):
+        """Reads the HELLO message of a new connection and hands the
+        connection to the agent that was given its token. Connections
+        that do not identify themselves are closed.
+        """
+
+        try:
+            data = await asyncio.wait_for(
+                reader.readline(), AsyncServer.HELLO_TIMEOUT
+            )
+        except (asyncio.TimeoutError, ValueError, ConnectionError):
+            data = b""
+
+        kind, _, token = data.decode("utf-8", errors="replace") \
+            .strip().partition(";")
+        future = None
+        if (kind == "HELLO"):
+            future = self._pending.pop(token, None)
+
+        if (future is None or future.done()):
+            writer.close()
+            return
+
+        future.set_result((reader, writer))
+
+    async def start_agent(self, run_s, silent=True, timeout_ns=30*10**9):
+        """Starts an agent and waits for it to connect and identify itself.
+        Returns the process and the reader and writer of its connection.
+        Both are None if the agent did not identify itself in time, or
+        exited before doing so.
+        """
+
+        token = secrets.token_hex(16)
+        connection = asyncio.get_running_loop().create_future()
+        self._pending[token] = connection
+
+        # whether to throw out all output of the agent
+        output = None
+        if (silent):
+            output = subprocess.DEVNULL
+
+        preexec_fn = None
+        if (self._limits is not None):
+            preexec_fn = self._limits.preexec()
+
+        process = await asyncio.create_subprocess_exec(
+            *shlex.split(run_s, posix=(platform != "win32")),
+            stdout=output, stderr=output, preexec_fn=preexec_fn,
+            env=dict(
+                os.environ, HEX_PORT=str(self.port), HEX_TOKEN=token,
+                HEX_ADDRESS=f"tcp:{self._host}:{self.port}"
+            )
+        )
+
+        exited = asyncio.ensure_future(process.wait())
+        try:
+            await asyncio.wait(
+                {connection, exited},
+                timeout=timeout_ns/10**9,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            self._pending.pop(token, None)
+            exited.cancel()
+
+        if (not connection.done()):
+            connection.cancel()
+            return process, None, None
+        return (process,) + connection.result()
+
+    async def play(self, **kwargs):
+        """Plays one match with the given AsyncGame arguments and returns
+        its results.
+        """
+
+        return await AsyncGame(self, **kwargs).run()
+
+    async def play_all(self, matches, concurrency=None):
+        """Plays every match in matches, a list of dicts of AsyncGame
+        arguments, with at most concurrency matches at a time. Returns the
+        results in the same order.
+        """
+
+        if (concurrency is None):
+            concurrency = len(matches)
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+        async def play(kwargs):
+            async with semaphore:
+                return await self.play(**kwargs)
+
+        return await asyncio.gather(*(play(m) for m in matches))
+
+
+class AsyncChannel():
+    """Handles communication between the engine and the two agents of one
+    match hosted by an AsyncServer.
+
+    It has the same interface as Protocol, except that accept_connection
+    and get_message are coroutines, and wait_closed has to be awaited
+    after close to reap the agents.
+    """
+
+    def __init__(self, server):
+        super().__init__()
+
+        self._server = server
+        self.agents = {Colour.RED: {}, Colour.BLUE: {}}
+
+    def start(self):
+        """Nothing to set up; the server is already listening."""
+        pass
+
+    async def accept_connection(
+        self,
+        run_s,
+        name,
+        timeout_ns=30*10**9,
+        silent=True,
+        verbose=False
+    ):
+        """Starts the agent and waits for it to identify itself. Returns
+        True if the connection was made, False otherwise.
+        """
+
+        # determine the colour of the new agent
+        if len(self.agents[Colour.RED].keys()) == 0:
+            colour = Colour.RED
+        elif len(self.agents[Colour.BLUE].keys()) == 0:
+            colour = Colour.BLUE
+        else:
+            raise ValueError("Too many agents specified.")
+
+        process, reader, writer = await self._server.start_agent(
+            run_s, silent, timeout_ns
+        )
+
+        self.agents[colour]['name'] = name
+        self.agents[colour]['process'] = process
+        self.agents[colour]['reader'] = reader
+        self.agents[colour]['writer'] = writer
+
+        if (writer is None):
+            if (verbose):
+                print(f"{name} never connected.")
+            return False
+
+        # CPU time is counted from here, so start-up is left out of it
+        self.agents[colour]['cpu_start'] = AgentLimits.get_cpu_time(process)
+
+        if (verbose):
+            print(f"Connected {name} at {writer.get_extra_info('peername')}")
+        return True
+
+    async def get_message(self, colour, timeout_ns=30*10**9, verbose=False):
+        """Waits for a message from the given colour agent for the specified
+        length of time. Returns the text and the associated wait time.
+        """
+
+        x = self.agents[colour]
+        try:
+            move_time = time_ns()
+            data = await asyncio.wait_for(
+                x['reader'].readline(), timeout_ns/10**9
+            )
+            move_time = time_ns() - move_time
+
+        except asyncio.TimeoutError:
+            if verbose:
+                print(f"{x['name']} timed out. Nothing received.")
+            return ("NO MESSAGE", -1)
+        except ValueError:
+            # longer than the maximum message length, so never a move
+            move_time = time_ns() - move_time
+            data = b""
+        except ConnectionError:
+            if verbose:
+                print(f"{x['name']} disconnected early.")
+            return ("NO MESSAGE", -1)
+
+        data = data.decode("utf-8", errors="replace").rstrip("\n")
+
+        if verbose:
+            print(
+                f"Received {data.strip()} from {x['name']} in " +
+                f"~{int(move_time/10**4)/10**5}s."
+            )
+
+        return (data, move_time)
+
+    def send_message(self, colour, message, verbose=False):
+        """Sends the specified message to the specified colour agent. The
+        message is buffered by the event loop, so this never blocks.
+        """
+
+        x = self.agents[colour]
+        try:
+            x['writer'].write(bytes(message, "utf-8"))
+            if verbose:
+                print("Sent", message, end="")
+
+        except Exception:
+            if verbose:
+                print(f"Failed to send {message.strip()} to {x['name']}.")
+
+    def swap(self):
+        """Switches the colours of the two agents."""
+
+        self.agents[Colour.RED], self.agents[Colour.BLUE] = \
+            self.agents[Colour.BLUE], self.agents[Colour.RED]
+
+    def get_cpu_time(self, colour):
+        """Returns the CPU time the given colour agent used between
+        connecting and the channel being closed, in nanoseconds, or None
+        if it is not known.
+        """
+        return self.agents[colour].get('cpu_time')
+
+    def close(self, kill_children=True, verbose=False):
+        """Kills the agents if kill_children=True. Their connections are
+        closed by wait_closed, once the agents have exited.
+        """
+
+        # the process is reaped by the event loop, so its CPU time is read
+        # while it still runs
+        for colour in Colour:
+            x = self.agents[colour]
+            if (x.get('process') is not None):
+                x['cpu_time'] = AgentLimits.cpu_since(
+                    AgentLimits.get_cpu_time(x['process']),
+                    x.get('cpu_start')
+                )
+
+        if (not kill_children):
+            return
+
+        for colour in Colour:
+            x = self.agents[colour]
+            if (x.get('process') is None):
+                continue
+
+            try:
+                x['process'].kill()
+            except ProcessLookupError:
+                pass
+            except Exception as e:
+                if (verbose):
+                    print(
+                        f"Couldn't close {x['name']} " +
+                        f"process. Exception raised: {e}"
+                    )
+
+    async def wait_closed(self):
+        """Waits for the agents to exit, then closes their connections."""
+
+        for colour in Colour:
+            x = self.agents[colour]
+            if (x.get('process') is not None):
+                await x['process'].wait()
+            if (x.get('writer') is not None):
+                x['writer'].close()
+
+
+class AsyncGame(Game):
+    """A game of Hex hosted by an AsyncServer, so that many can be played
+    at the same time in one process. Only socket agents are supported.
+    """
+
+    def __init__(self, server, **kwargs):
+        for player in (kwargs.get('player1'), kwargs.get('player2')):
+            if (player is not None and player.get('agent') is not None):
+                raise ValueError("AsyncGame only supports socket agents.")
+
+        super().__init__(**kwargs)
+        self._protocol = AsyncChannel(server)
+
+    async def run(self):
+        """Runs the match and returns its results."""
+        try:
+            await self._play()
+        except Exception as e:
+            self._end_game(None)
+            print(f"Exception raised: {e}")
+
+        await self._protocol.wait_closed()
+        return self.get_results()
+
+    async def _play(self):
+        """Main method for a match. Same as Game._play, but waiting for
+        the agents lets other matches run.
+        """
+
+        # connect to the agents
+        await self._start_protocol(
+            self._players[Colour.RED]['run string'],
+            self._players[Colour.RED]['name'],
+            self._players[Colour.BLUE]['run string'],
+            self._players[Colour.BLUE]['name']
+        )
+        # test the connection
+        if (not self._has_connected):
+            self._end_game(EndState.TIMEOUT)
+            return
+
+        self._start_match()
+
+        end_state = None
+        while (end_state is None and not self._board.has_ended()):
+            # get a move from the agents
+            answer, move_time = await self._protocol.get_message(
+                self._player,
+                self._get_time_left(),
+                self._print_protocol
+            )
+            end_state = self._play_turn(answer, move_time)
+
+        if (end_state is None):
+            end_state = EndState.WIN
+        self._end_game(end_state)
+
+    async def _start_protocol(self, s1, name1, s2, name2):
+        """Starts the agents and waits for them to connect. If either
+        connection fails, the game will not start.
+        """
+
+        self._has_connected = await self._protocol.accept_connection(
+            s1, name1, self._time_limit,
+            self._silent_bots, self._print_protocol
+        )
+        if (not self._has_connected):
+            self._players[Colour.RED]['time'] = self._time_limit
+            return
+
+        self._has_connected = await self._protocol.accept_connection(
+            s2, name2, self._time_limit,
+            self._silent_bots, self._print_protocol
+        )
+        if (not self._has_connected):
+            self._players[Colour.BLUE]['time'] = self._time_limit
+            self._player = self._player.opposite()
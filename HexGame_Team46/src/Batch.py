@@ -0,0 +1,249 @@
+"""This script plays every match listed in a manifest, in one process.
+
+The server socket is opened once and kept for every game, and with
+-reuse so are the agent processes, so short matches do not pay for a new
+engine each time. The standings are printed at the end.
+
+A manifest is a JSON or YAML file with either a list of matches, or an
+object with "matches" and "defaults" that apply to every match. It can
+also be a CSV file with one match per row and the fields as columns.
+YAML manifests need PyYAML.
+
+Match fields:
+* "red" and "blue" are the agents, as "name;command". They are needed,
+and their names must differ.
+* "board_size" defaults to 11.
+* "repeat" is the number of games. Defaults to 1.
+* "alternate" swaps the colours of every other game.
+* "seed" is given to the agents of the first game in the HEX_SEED
+environment variable, and increased by one every game. It cannot be
+used with -reuse, as reused agents keep the seed they started with.
+* "time", "increment" and "move_time" set the time control in seconds,
+as in Hex.py. "clock" sends the clocks to the agents.
+* "log" saves every game to a csv file under logs, and "log_dir" sets
+the directory under logs, as in Hex.py.
+* "bitboard" keeps the engine board as bitmasks.
+
+Possible arguments:
+* The path of the manifest.
+* "summary=path" also saves the standings and the results of every game
+as JSON.
+* "-reuse" or "-r" keeps agent processes running between games, for
+agents that support the NEWGAME extension (see AgentPool).
+"""
+import csv
+import json
+import os
+from sys import argv
+
+from AgentPool import AgentPool
+from Game import Game
+from Protocol import Protocol
+from Standings import Standings
+
+
+class Batch():
+    """This class describes a list of matches played one after another in
+    this process.
+    """
+
+    # the type of every match field, for manifests that only have strings
+    FIELDS = {
+        'red': str,
+        'blue': str,
+        'board_size': int,
+        'repeat': int,
+        'alternate': bool,
+        'seed': int,
+        'time': float,
+        'increment': float,
+        'move_time': float,
+        'clock': bool,
+        'log': bool,
+        'log_dir': str,
+        'bitboard': bool
+    }
+
+    def __init__(self, matches, reuse=False):
+        super().__init__()
+
+        self._matches = [Batch.parse_match(match) for match in matches]
+        if (reuse and any('seed' in match for match in self._matches)):
+            raise ValueError(
+                "'seed' cannot be used with -reuse, as reused agents keep " +
+                "the seed they started with."
+            )
+        self._reuse = reuse
+        self._games = []
+        self._standings = Standings()
+
+    def load(path):
+        """Returns the list of matches in the manifest at the given path,
+        with the defaults applied.
+        """
+
+        extension = path.rsplit(".", 1)[-1].lower()
+        with open(path, newline="") as f:
+            if (extension == "csv"):
+                return [
+                    {key: value for key, value in row.items()
+                     if value not in (None, "")}
+                    for row in csv.DictReader(f)
+                ]
+
+            if (extension in ("yaml", "yml")):
+                # only needed for YAML manifests
+                import yaml
+                manifest = yaml.safe_load(f)
+            else:
+                manifest = json.load(f)
+
+        if (isinstance(manifest, dict)):
+            defaults = manifest.get("defaults", {})
+            return [dict(defaults, **match)
+                    for match in manifest.get("matches", [])]
+        return manifest
+
+    def parse_match(match):
+        """Returns the match with every field converted to its type, and
+        the agents as player dicts. Raises ValueError if a field is
+        unknown, missing or not valid.
+        """
+
+        parsed = {}
+        for key, value in match.items():
+            if (key not in Batch.FIELDS):
+                raise ValueError(f"Unknown field '{key}'.")
+            kind = Batch.FIELDS[key]
+            if (kind is bool and isinstance(value, str)):
+                value = value.strip().lower() in ("1", "true", "yes")
+            parsed[key] = kind(value)
+
+        for colour in ("red", "blue"):
+            if (colour not in parsed):
+                raise ValueError(f"Match without '{colour}'.")
+            name, separator, run_string = parsed[colour].partition(";")
+            if (separator == ""):
+                raise ValueError(f"Agent '{parsed[colour]}' is not valid.")
+            parsed[colour] = {'name': name, 'run string': run_string}
+
+        if (parsed['red']['name'] == parsed['blue']['name']):
+            raise ValueError("The agents of a match need different names.")
+
+        return parsed
+
+    def run(self):
+        """Plays every game and returns the standings."""
+
+        # one server on a free port for every game
+        Protocol.PORT = 0
+        Protocol.keep_server = True
+        if (self._reuse):
+            Protocol.pool = AgentPool()
+
+        try:
+            for match in self._matches:
+                for game in range(match.get('repeat', 1)):
+                    self._play(match, game)
+        finally:
+            Protocol.keep_server = False
+            if (Protocol.s is not None):
+                Protocol.shutdown()
+            if (Protocol.pool is not None):
+                Protocol.pool.close()
+                Protocol.pool = None
+
+        return self.get_standings()
+
+    def _play(self, match, game):
+        """Plays the given game of a match and records its results."""
+
+        red, blue = match['red'], match['blue']
+        if (match.get('alternate', False) and game % 2 == 1):
+            red, blue = blue, red
+
+        # agents started from now on inherit the seed
+        if ('seed' in match):
+            os.environ['HEX_SEED'] = str(match['seed'] + game)
+        else:
+            os.environ.pop('HEX_SEED', None)
+
+        time_limit = Game.MAXIMUM_TIME
+        if ('time' in match):
+            time_limit = int(match['time'] * 10**9)
+        move_limit = None
+        if ('move_time' in match):
+            move_limit = int(match['move_time'] * 10**9)
+
+        g = Game(
+            board_size=match.get('board_size', 11),
+            player1=red, player2=blue,
+            log=match.get('log', False),
+            kill_bots=True,
+            silent_bots=True,
+            bitboard=match.get('bitboard', False),
+            log_dir=match.get('log_dir'),
+            time_limit=time_limit,
+            increment=int(match.get('increment', 0) * 10**9),
+            move_limit=move_limit,
+            send_clock=match.get('clock', False)
+        )
+        g.run()
+
+        results = g.get_results()
+        self._games.append({
+            'red': red['name'],
+            'blue': blue['name'],
+            'results': results
+        })
+        self._standings.record(red['name'], blue['name'], results)
+
+    def get_standings(self):
+        """Returns a list of (name, stats) pairs, best first."""
+        return self._standings.get_standings()
+
+    def print_standings(self):
+        """Prints the standings as a table."""
+        self._standings.print_standings()
+
+    def get_summary(self):
+        """Returns the standings and the results of every game."""
+
+        return {
+            'standings': dict(self.get_standings()),
+            'games': self._games
+        }
+
+
+def main():
+    manifest = None
+    summary_path = None
+    reuse = ("-r" in argv or "-reuse" in argv)
+
+    for argument in argv[1:]:
+        if (argument.startswith("summary=")):
+            summary_path = argument.split("=", 1)[1]
+        elif (not argument.startswith("-")):
+            manifest = argument
+
+    if (manifest is None):
+        print("ERROR: No manifest given. Aborted.")
+        return
+
+    try:
+        batch = Batch(Batch.load(manifest), reuse)
+    except (OSError, ValueError, TypeError, ImportError) as e:
+        print(f"ERROR: Manifest '{manifest}' is not valid: {e} Aborted.")
+        return
+
+    batch.run()
+    batch.print_standings()
+
+    if (summary_path is not None):
+        with open(summary_path, "w") as f:
+            json.dump(batch.get_summary(), f, indent=4)
+        print(f"Saved summary to {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import numpy as np
+
+from Board import Board
+from Colour import Colour
+
+
+class BatchWinner():
+    """Static class that decides the winners of many boards at once with
+    NumPy.
+
+    Positions are given as an (N, size, size) int8 array where [k, x, y]
+    is tile (x, y) of board k, using the cell codes of Board.CODES: 0 for
+    empty, 1 for red and 2 for blue.
+    """
+
+    NONE = Board.CODES[None]
+    RED = Board.CODES[Colour.RED]
+    BLUE = Board.CODES[Colour.BLUE]
+
+    @staticmethod
+    def to_array(boards):
+        """Stacks the given boards into an (N, size, size) int8 array. All
+        boards must have the same size.
+        """
+
+        size = boards[0].get_size()
+        positions = np.empty((len(boards), size, size), dtype=np.int8)
+        for k, b in enumerate(boards):
+            positions[k] = np.frombuffer(
+                b.get_cells(), dtype=np.int8
+            ).reshape(size, size)
+        return positions
+
+    @staticmethod
+    def _spread(reached, stones):
+        """Returns reached grown by one tile in every hex direction, kept
+        within stones.
+        """
+
+        grown = reached.copy()
+        # (x+1, y) and (x-1, y)
+        grown[:, 1:, :] |= reached[:, :-1, :]
+        grown[:, :-1, :] |= reached[:, 1:, :]
+        # (x, y+1) and (x, y-1)
+        grown[:, :, 1:] |= reached[:, :, :-1]
+        grown[:, :, :-1] |= reached[:, :, 1:]
+        # (x-1, y+1) and (x+1, y-1)
+        grown[:, :-1, 1:] |= reached[:, 1:, :-1]
+        grown[:, 1:, :-1] |= reached[:, :-1, 1:]
+        grown &= stones
+        return grown
+
+    @staticmethod
+    def _connected(stones, start):
+        """Floods every board's stones from the tiles set in start and
+        returns the final reached mask.
+        """
+
+        reached = stones & start
+        # a flood cannot take more steps than there are tiles
+        for i in range(stones.shape[1] * stones.shape[2]):
+            grown = BatchWinner._spread(reached, stones)
+            if (np.array_equal(grown, reached)):
+                break
+            reached = grown
+        return reached
+
+    @staticmethod
+    def get_winners(positions):
+        """Returns an int8 array with the winner of each position: RED if
+        red connects top to bottom, BLUE if blue connects left to right,
+        NONE otherwise. Red is reported if both connect.
+        """
+
+        positions = np.asarray(positions, dtype=np.int8)
+        if (positions.ndim == 2):
+            positions = positions[np.newaxis]
+
+        start = np.zeros(positions.shape[1:], dtype=bool)
+
+        # red: row x = 0 to row x = size-1
+        start[0, :] = True
+        red = BatchWinner._connected(positions == BatchWinner.RED, start)
+        red_wins = red[:, -1, :].any(axis=1)
+
+        # blue: column y = 0 to column y = size-1
+        start[:] = False
+        start[:, 0] = True
+        blue = BatchWinner._connected(positions == BatchWinner.BLUE, start)
+        blue_wins = blue[:, :, -1].any(axis=1)
+
+        winners = np.full(len(positions), BatchWinner.NONE, dtype=np.int8)
+        winners[blue_wins] = BatchWinner.BLUE
+        winners[red_wins] = BatchWinner.RED
+        return winners
+
+
+if (__name__ == "__main__"):
+    b = Board.from_string(
+        "0R000B00000,0R000000000,0RBB0000000,0R000000000,0R00B000000," +
+        "0R000BB0000,0R0000B0000,0R00000B000,0R000000B00,0R0000000B0," +
+        "0R00000000B", bnf=True
+    )
+    print(BatchWinner.get_winners(BatchWinner.to_array([b, Board(11)])))
@@ -0,0 +1,329 @@
+from Tile import Tile
+from Colour import Colour
+from Zobrist import Zobrist
+from BoardMixin import BoardMixin
+
+
+class BitBoard(BoardMixin):
+    """Hex board that stores each colour as an int bitmask.
+
+    Tile (x, y) is bit x * board_size + y. It offers the same interface as
+    Board, so either can be used by the engine and the agents, but it
+    copies in O(1) and checks connectivity with shifts and masks instead
+    of walking tile objects.
+    """
+
+    __slots__ = ("_board_size", "_masks", "_red", "_blue", "_winner",
+                 "_unchecked", "_bnf", "_zobrist_keys", "_hash",
+                 "_rotated_hash")
+
+    # masks for every board size used so far, shared by all boards
+    _MASKS = {}
+
+    # tables to turn tile characters into binary digits for each colour
+    _RED_BITS = bytes(
+        ord("1") if chr(c) == "R" else ord("0") for c in range(256)
+    )
+    _BLUE_BITS = bytes(
+        ord("1") if chr(c) == "B" else ord("0") for c in range(256)
+    )
+    _SEPARATORS = b", \t\r\n"
+
+    def __init__(self, board_size=11):
+        super().__init__()
+
+        self._board_size = board_size
+        self._masks = BitBoard.get_masks(board_size)
+
+        self._red = 0
+        self._blue = 0
+        self._winner = None
+
+        # colours placed since connectivity was last checked
+        self._unchecked = set()
+
+        # protocol representation, built on first use and then patched
+        # on every change; copies start without one to stay O(1)
+        self._bnf = None
+
+        # Zobrist hashes of the position and of its 180 degree rotation
+        self._zobrist_keys = Zobrist.get_keys(board_size)
+        self._hash = 0
+        self._rotated_hash = 0
+
+    @staticmethod
+    def get_masks(board_size):
+        """Returns the precomputed masks for the given size, as a dict with
+        the full board, each edge, the columns a shift is allowed to land
+        in and the neighbours of every tile.
+        """
+
+        masks = BitBoard._MASKS.get(board_size)
+        if (masks is not None):
+            return masks
+
+        size = board_size
+        full = (1 << (size * size)) - 1
+
+        top, bottom, left, right = 0, 0, 0, 0
+        for idx in range(size):
+            top |= 1 << idx
+            bottom |= 1 << ((size - 1) * size + idx)
+            left |= 1 << (idx * size)
+            right |= 1 << (idx * size + size - 1)
+
+        neighbours = []
+        for x in range(size):
+            for y in range(size):
+                mask = 0
+                for n in range(Tile.NEIGHBOUR_COUNT):
+                    x_n = x + Tile.I_DISPLACEMENTS[n]
+                    y_n = y + Tile.J_DISPLACEMENTS[n]
+                    if (x_n >= 0 and x_n < size and
+                            y_n >= 0 and y_n < size):
+                        mask |= 1 << (x_n * size + y_n)
+                neighbours.append(mask)
+
+        masks = {
+            'full': full,
+            'top': top,
+            'bottom': bottom,
+            'left': left,
+            'right': right,
+            # a shift towards higher y must not wrap into the first column
+            'not left': full & ~left,
+            # a shift towards lower y must not wrap into the last column
+            'not right': full & ~right,
+            'neighbours': neighbours
+        }
+        BitBoard._MASKS[board_size] = masks
+        return masks
+
+    def from_string(string_input, board_size=11, bnf=True):
+        """Loads a board from a string representation. If bnf=True, it will
+        load a protocol-formatted string. Otherwise, it will load from a
+        human-readable-formatted board.
+
+        Each colour's mask is decoded in one pass with bytes.translate.
+        """
+
+        b = BitBoard(board_size=board_size)
+
+        chars = string_input.encode("ascii").translate(
+            None, BitBoard._SEPARATORS
+        )
+        if (len(chars) != board_size * board_size):
+            raise ValueError(
+                f"Expected {board_size * board_size} tiles. " +
+                f"Got {len(chars)}."
+            )
+
+        # reversed so that tile 0 becomes the lowest bit
+        chars = chars[::-1]
+        b._red = int(chars.translate(BitBoard._RED_BITS), 2)
+        b._blue = int(chars.translate(BitBoard._BLUE_BITS), 2)
+
+        keys = b._zobrist_keys
+        last = board_size * board_size - 1
+        for colour, stones in ((Colour.RED, b._red), (Colour.BLUE, b._blue)):
+            while (stones):
+                bit = stones & -stones
+                idx = bit.bit_length() - 1
+                b._hash ^= keys[colour][idx]
+                b._rotated_hash ^= keys[colour][last - idx]
+                stones ^= bit
+
+        b._unchecked = {Colour.RED, Colour.BLUE}
+        return b
+
+    def copy(self):
+        """Returns an independent copy of the board in O(1)."""
+
+        b = BitBoard.__new__(BitBoard)
+        b._board_size = self._board_size
+        b._masks = self._masks
+        b._red = self._red
+        b._blue = self._blue
+        b._winner = self._winner
+        b._unchecked = set(self._unchecked)
+        b._bnf = None
+        b._zobrist_keys = self._zobrist_keys
+        b._hash = self._hash
+        b._rotated_hash = self._rotated_hash
+        return b
+
+    def _spread(self, group):
+        """Returns the group grown by one tile in every hex direction."""
+
+        size = self._board_size
+        masks = self._masks
+        return (
+            group | (group << size) | (group >> size) |
+            ((group << 1) & masks['not left']) |
+            ((group >> 1) & masks['not right']) |
+            ((group >> (size - 1)) & masks['not left']) |
+            ((group << (size - 1)) & masks['not right'])
+        )
+
+    def _connects(self, stones, start, goal):
+        """Floods stones from the start edge and checks if the flood
+        reaches the goal edge.
+        """
+
+        reached = stones & start
+        while (reached):
+            if (reached & goal):
+                return True
+            grown = self._spread(reached) & stones
+            if (grown == reached):
+                return False
+            reached = grown
+
+        return False
+
+    def has_ended(self):
+        """Checks if the game has ended. It will attempt to find a red chain
+        from top to bottom or a blue chain from left to right of the board.
+        Only colours placed since the last check are flooded.
+        """
+
+        if (self._winner is None and self._unchecked):
+            masks = self._masks
+            if (Colour.RED in self._unchecked and
+                    self._connects(self._red, masks['top'],
+                                   masks['bottom'])):
+                self._winner = Colour.RED
+            elif (Colour.BLUE in self._unchecked and
+                    self._connects(self._blue, masks['left'],
+                                   masks['right'])):
+                self._winner = Colour.BLUE
+            self._unchecked.clear()
+
+        return self._winner is not None
+
+    def print_board(self, bnf=True):
+        """Returns the string representation of a board. If bnf=True, the
+        string will be formatted according to the communication protocol.
+        """
+
+        size = self._board_size
+        if (bnf and self._bnf is not None):
+            return self._bnf.decode("ascii")
+
+        lines = []
+        for x in range(size):
+            line = []
+            for y in range(size):
+                line.append(Colour.get_char(self.get_tile_colour(x, y)))
+            lines.append(line)
+
+        if (bnf):
+            self._bnf = bytearray(
+                ",".join("".join(line) for line in lines), "ascii"
+            )
+            return self._bnf.decode("ascii")
+
+        output = ""
+        for x, line in enumerate(lines):
+            output += " " * x + " ".join(line) + " \n"
+        return output
+
+    def get_winner(self):
+        return self._winner
+
+    def get_size(self):
+        return self._board_size
+
+    def get_red(self):
+        return self._red
+
+    def get_blue(self):
+        return self._blue
+
+    def get_cells(self):
+        """Returns the cell codes of the board, one byte per tile indexed
+        by x * board_size + y, using the codes of Board.CODES.
+        """
+
+        cells = bytearray(self._board_size * self._board_size)
+        for idx in range(len(cells)):
+            if ((self._red >> idx) & 1):
+                cells[idx] = 1
+            elif ((self._blue >> idx) & 1):
+                cells[idx] = 2
+        return cells
+
+    def get_neighbour_mask(self, x, y):
+        return self._masks['neighbours'][x * self._board_size + y]
+
+    def get_tiles(self):
+        """Returns a snapshot of the board as a grid of Tile objects.
+        Changing these tiles does not change the board.
+        """
+
+        tiles = []
+        for x in range(self._board_size):
+            tiles.append([Tile(x, y, self.get_tile_colour(x, y))
+                          for y in range(self._board_size)])
+        return tiles
+
+    def get_tile_colour(self, x, y):
+        bit = 1 << (x * self._board_size + y)
+        if (self._red & bit):
+            return Colour.RED
+        elif (self._blue & bit):
+            return Colour.BLUE
+        return None
+
+    def get_hash(self):
+        """Returns the 64-bit Zobrist hash of the position."""
+        return self._hash
+
+    def get_canonical_hash(self):
+        """Returns a 64-bit hash that is the same for a position and its
+        180 degree rotation.
+        """
+        return min(self._hash, self._rotated_hash)
+
+    def set_tile_colour(self, x, y, colour):
+        size = self._board_size
+        idx = x * size + y
+        rotated_idx = size * size - 1 - idx
+        bit = 1 << idx
+
+        previous = self.get_tile_colour(x, y)
+        if (previous is not None):
+            self._hash ^= self._zobrist_keys[previous][idx]
+            self._rotated_hash ^= self._zobrist_keys[previous][rotated_idx]
+        if (colour is not None):
+            self._hash ^= self._zobrist_keys[colour][idx]
+            self._rotated_hash ^= self._zobrist_keys[colour][rotated_idx]
+
+        if (previous is not None):
+            # overwriting a stone can break a chain, so check from scratch
+            self._red &= ~bit
+            self._blue &= ~bit
+            self._winner = None
+            self._unchecked.update((Colour.RED, Colour.BLUE))
+
+        if (colour == Colour.RED):
+            self._red |= bit
+            self._unchecked.add(colour)
+        elif (colour == Colour.BLUE):
+            self._blue |= bit
+            self._unchecked.add(colour)
+
+        if (self._bnf is not None):
+            self._bnf[x * (self._board_size + 1) + y] = ord(
+                Colour.get_char(colour)
+            )
+
+
+if (__name__ == "__main__"):
+    b = BitBoard.from_string(
+        "0R000B00000,0R000000000,0RBB0000000,0R000000000,0R00B000000," +
+        "0R000BB0000,0R0000B0000,0R00000B000,0R000000B00,0R0000000B0," +
+        "0R00000000B", bnf=True
+    )
+    print(b.print_board(bnf=False))
+    print(b.has_ended(), b.get_winner())
@@ -1,65 +1,169 @@
+from array import array
+
 from Tile import Tile
 from Colour import Colour
+from Zobrist import Zobrist
+from BoardMixin import BoardMixin
+
+
+class Board(BoardMixin):
+    """Class that describes the Hex board.
+
+    The state of every tile is kept in flat arrays indexed by
+    x * board_size + y. Tile objects are only made when get_tiles() is
+    called, and they read and write through to the board.
+    """
 
+    __slots__ = ("_board_size", "_cells", "_visited", "_tiles", "_winner",
+                 "_bnf", "_zobrist_keys", "_hash", "_rotated_hash", "_top",
+                 "_bottom", "_left", "_right", "_parent", "_stale")
 
-class Board:
-    """Class that describes the Hex board."""
+    # colour stored in a cell for each code, and the reverse
+    COLOURS = (None, Colour.RED, Colour.BLUE)
+    CODES = {None: 0, Colour.RED: 1, Colour.BLUE: 2}
+
+    # tables to decode tile characters to codes and back; any other
+    # character is read as empty, like Colour.from_char does
+    _DECODE = bytes(
+        {"R": 1, "B": 2}.get(chr(c), 0) for c in range(256)
+    )
+    _ENCODE = bytes.maketrans(b"\x00\x01\x02", b"0RB")
+    _SEPARATORS = b", \t\r\n"
+
+    # in-board neighbour indices of every cell, for every size used so far
+    _NEIGHBOURS = {}
 
     def __init__(self, board_size=11):
         super().__init__()
 
         self._board_size = board_size
 
-        self._tiles = []
-        for i in range(board_size):
-            new_line = []
-            for j in range(board_size):
-                new_line.append(Tile(i, j))
-            self._tiles.append(new_line)
+        cell_count = board_size * board_size
+        self._cells = bytearray(cell_count)
+
+        # scratch marks for DFS_colour, allocated on first use
+        self._visited = None
+
+        # Tile views, made on the first call to get_tiles()
+        self._tiles = None
 
         self._winner = None
 
+        # protocol representation of the board, patched on every change;
+        # tile (x, y) is the byte at x * (board_size + 1) + y
+        self._bnf = bytearray(b",".join([b"0" * board_size] * board_size))
+
+        # Zobrist hashes of the position and of its 180 degree rotation,
+        # which maps tile (x, y) to (size-1-x, size-1-y)
+        self._zobrist_keys = Zobrist.get_keys(board_size)
+        self._hash = 0
+        self._rotated_hash = 0
+
+        # disjoint-set forest over the tiles, plus four virtual nodes
+        # standing for the edges of the board
+        self._top = cell_count
+        self._bottom = cell_count + 1
+        self._left = cell_count + 2
+        self._right = cell_count + 3
+        self._parent = array("i", range(cell_count + 4))
+
+        # set when a stone is removed or recoloured, which the forest
+        # cannot undo; it is then rebuilt on the next check
+        self._stale = False
+
+    @staticmethod
+    def get_neighbours(board_size):
+        """Returns a list with, for every cell index, a tuple of the indices
+        of its neighbours that are on the board.
+        """
+
+        neighbours = Board._NEIGHBOURS.get(board_size)
+        if (neighbours is not None):
+            return neighbours
+
+        neighbours = []
+        for x in range(board_size):
+            for y in range(board_size):
+                cell_neighbours = []
+                for idx in range(Tile.NEIGHBOUR_COUNT):
+                    x_n = x + Tile.I_DISPLACEMENTS[idx]
+                    y_n = y + Tile.J_DISPLACEMENTS[idx]
+                    if (x_n >= 0 and x_n < board_size and
+                            y_n >= 0 and y_n < board_size):
+                        cell_neighbours.append(x_n * board_size + y_n)
+                neighbours.append(tuple(cell_neighbours))
+
+        Board._NEIGHBOURS[board_size] = neighbours
+        return neighbours
+
     def from_string(string_input, board_size=11, bnf=True):
         """Loads a board from a string representation. If bnf=True, it will
         load a protocol-formatted string. Otherwise, it will load from a
         human-readable-formatted board.
+
+        The string is decoded in one pass with bytes.translate, and the
+        chains and hashes are then built once.
         """
 
         b = Board(board_size=board_size)
 
-        if (bnf):
-            lines = string_input.split(",")
-            for i, line in enumerate(lines):
-                for j, char in enumerate(line):
-                    b.set_tile_colour(i, j, Colour.from_char(char))
-        else:
-            lines = [line.strip() for line in string_input.split("\n")]
-            for i, line in enumerate(lines):
-                chars = line.split(" ")
-                for j, char in enumerate(chars):
-                    b.set_tile_colour(i, j, Colour.from_char(char))
+        cells = string_input.encode("ascii").translate(
+            Board._DECODE, Board._SEPARATORS
+        )
+        if (len(cells) != len(b._cells)):
+            raise ValueError(
+                f"Expected {len(b._cells)} tiles. Got {len(cells)}."
+            )
+
+        b._cells[:] = cells
+        lines = cells.translate(Board._ENCODE)
+        b._bnf[:] = b",".join(
+            lines[i:i + board_size]
+            for i in range(0, len(lines), board_size)
+        )
+
+        size = board_size
+        for idx, code in enumerate(cells):
+            if (code != 0):
+                colour = Board.COLOURS[code]
+                b._hash ^= b._zobrist_keys[colour][idx]
+                b._rotated_hash ^= b._zobrist_keys[colour][
+                    size * size - 1 - idx
+                ]
+        b._rebuild_groups()
 
         return b
 
     def has_ended(self):
-        """Checks if the game has ended. It will attempt to find a red chain
-        from top to bottom or a blue chain from left to right of the board.
+        """Checks if the game has ended, i.e. if there is a red chain from
+        top to bottom or a blue chain from left to right of the board.
+
+        Chains are tracked incrementally as stones are placed, so this does
+        not scan the board.
+        """
+
+        if (self._stale):
+            self._rebuild_groups()
+
+        return self._winner is not None
+
+    def has_ended_scan(self):
+        """Checks if the game has ended by searching the whole board with
+        DFS_colour. Slower than has_ended, kept as a reference check.
         """
 
         # Red
         # for all top tiles, check if they connect to bottom
         for idx in range(self._board_size):
-            tile = self._tiles[0][idx]
-            if (not tile.is_visited() and
-                tile.get_colour() == Colour.RED and
+            if (not self.is_tile_visited(0, idx) and
+                self.get_tile_colour(0, idx) == Colour.RED and
                     self._winner is None):
                 self.DFS_colour(0, idx, Colour.RED)
         # Blue
         # for all left tiles, check if they connect to right
         for idx in range(self._board_size):
-            tile = self._tiles[idx][0]
-            if (not tile.is_visited() and
-                tile.get_colour() == Colour.BLUE and
+            if (not self.is_tile_visited(idx, 0) and
+                self.get_tile_colour(idx, 0) == Colour.BLUE and
                     self._winner is None):
                 self.DFS_colour(idx, 0, Colour.BLUE)
 
@@ -71,16 +175,25 @@ class Board:
     def clear_tiles(self):
         """Clears the visited status from all tiles."""
 
-        for line in self._tiles:
-            for tile in line:
-                tile.clear_visit()
+        if (self._visited is not None):
+            self._visited[:] = bytes(len(self._visited))
+
+    def visit_tile(self, x, y, visited=True):
+        if (self._visited is None):
+            self._visited = bytearray(len(self._cells))
+        self._visited[x * self._board_size + y] = visited
+
+    def is_tile_visited(self, x, y):
+        if (self._visited is None):
+            return False
+        return self._visited[x * self._board_size + y] == 1
 
     def DFS_colour(self, x, y, colour):
         """A recursive DFS method that iterates through connected same-colour
         tiles until it finds a bottom tile (Red) or a right tile (Blue).
         """
 
-        self._tiles[x][y].visit()
+        self.visit_tile(x, y)
 
         # win conditions
         if (colour == Colour.RED):
@@ -102,9 +215,8 @@ class Board:
             y_n = y + Tile.J_DISPLACEMENTS[idx]
             if (x_n >= 0 and x_n < self._board_size and
                     y_n >= 0 and y_n < self._board_size):
-                neighbour = self._tiles[x_n][y_n]
-                if (not neighbour.is_visited() and
-                        neighbour.get_colour() == colour):
+                if (not self.is_tile_visited(x_n, y_n) and
+                        self.get_tile_colour(x_n, y_n) == colour):
                     self.DFS_colour(x_n, y_n, colour)
 
     def print_board(self, bnf=True):
@@ -114,18 +226,14 @@ class Board:
 
         output = ""
         if (bnf):
-            for line in self._tiles:
-                for tile in line:
-                    output += Colour.get_char(tile.get_colour())
-                output += ","
-            output = output[:-1]
+            output = self._bnf.decode("ascii")
         else:
             leading_spaces = ""
-            for line in self._tiles:
+            for line in self._bnf.decode("ascii").split(","):
                 output += leading_spaces
                 leading_spaces += " "
-                for tile in line:
-                    output += Colour.get_char(tile.get_colour()) + " "
+                for char in line:
+                    output += char + " "
                 output += "\n"
 
         return output
@@ -137,10 +245,137 @@ class Board:
         return self._board_size
 
     def get_tiles(self):
+        """Returns the board as a grid of Tile views. Changing a tile
+        changes the board.
+        """
+
+        if (self._tiles is None):
+            self._tiles = [
+                [Tile(x, y, board=self) for y in range(self._board_size)]
+                for x in range(self._board_size)
+            ]
         return self._tiles
 
+    def get_hash(self):
+        """Returns the 64-bit Zobrist hash of the position."""
+        return self._hash
+
+    def get_canonical_hash(self):
+        """Returns a 64-bit hash that is the same for a position and its
+        180 degree rotation.
+        """
+        return min(self._hash, self._rotated_hash)
+
+    def get_cells(self):
+        """Returns the cell codes of the board, one byte per tile indexed
+        by x * board_size + y. The buffer must not be modified.
+        """
+        return self._cells
+
+    def get_tile_colour(self, x, y):
+        return Board.COLOURS[self._cells[x * self._board_size + y]]
+
+    def copy(self):
+        """Returns an independent copy of the board."""
+
+        b = Board.__new__(Board)
+        b._board_size = self._board_size
+        b._cells = self._cells[:]
+        b._visited = None
+        b._tiles = None
+        b._winner = self._winner
+        b._bnf = self._bnf[:]
+        b._zobrist_keys = self._zobrist_keys
+        b._hash = self._hash
+        b._rotated_hash = self._rotated_hash
+        b._top = self._top
+        b._bottom = self._bottom
+        b._left = self._left
+        b._right = self._right
+        b._parent = self._parent[:]
+        b._stale = self._stale
+        return b
+
     def set_tile_colour(self, x, y, colour):
-        self._tiles[x][y].set_colour(colour)
+        size = self._board_size
+        idx = x * size + y
+        code = Board.CODES[colour]
+        previous = Board.COLOURS[self._cells[idx]]
+        self._cells[idx] = code
+        self._bnf[x * (size + 1) + y] = ord(Colour.get_char(colour))
+
+        rotated_idx = size * size - 1 - idx
+        if (previous is not None):
+            self._hash ^= self._zobrist_keys[previous][idx]
+            self._rotated_hash ^= self._zobrist_keys[previous][rotated_idx]
+        if (colour is not None):
+            self._hash ^= self._zobrist_keys[colour][idx]
+            self._rotated_hash ^= self._zobrist_keys[colour][rotated_idx]
+
+        if (previous is None and colour is not None):
+            self._join_groups(idx, code)
+        elif (previous != colour):
+            self._stale = True
+
+    def _find(self, idx):
+        """Returns the root of the group containing idx, halving the path
+        on the way up.
+        """
+
+        parent = self._parent
+        while (parent[idx] != idx):
+            parent[idx] = parent[parent[idx]]
+            idx = parent[idx]
+        return idx
+
+    def _union(self, a, b):
+        """Merges the groups containing a and b."""
+
+        root_a = self._find(a)
+        root_b = self._find(b)
+        if (root_a != root_b):
+            self._parent[root_a] = root_b
+
+    def _join_groups(self, idx, code):
+        """Merges a newly placed stone with its same-colour neighbours and
+        with the edges it touches, then checks if it completed a chain.
+        """
+
+        size = self._board_size
+        cells = self._cells
+
+        for n_idx in Board.get_neighbours(size)[idx]:
+            if (cells[n_idx] == code):
+                self._union(idx, n_idx)
+
+        x, y = divmod(idx, size)
+        if (code == Board.CODES[Colour.RED]):
+            if (x == 0):
+                self._union(idx, self._top)
+            if (x == size - 1):
+                self._union(idx, self._bottom)
+            if (self._winner is None and
+                    self._find(self._top) == self._find(self._bottom)):
+                self._winner = Colour.RED
+        else:
+            if (y == 0):
+                self._union(idx, self._left)
+            if (y == size - 1):
+                self._union(idx, self._right)
+            if (self._winner is None and
+                    self._find(self._left) == self._find(self._right)):
+                self._winner = Colour.BLUE
+
+    def _rebuild_groups(self):
+        """Rebuilds the forest and the winner from the current tiles."""
+
+        self._parent = array("i", range(len(self._parent)))
+        self._winner = None
+        self._stale = False
+
+        for idx, code in enumerate(self._cells):
+            if (code != 0):
+                self._join_groups(idx, code)
 
 
 if (__name__ == "__main__"):
@@ -0,0 +1,30 @@
+from Colour import Colour
+
+
+class BoardMixin():
+    """Methods shared by Board and BitBoard. They only use the board size
+    and set_tile_colour, so they work on either representation.
+    """
+
+    __slots__ = ()
+
+    def apply_change(self, message):
+        """Updates the board from a CHANGE message, reading only the moved
+        tile rather than the whole board string. Returns the move as an
+        (x, y) tuple, or "SWAP".
+        """
+
+        first = message.index(";")
+        second = message.index(";", first + 1)
+        if (message[:first] != "CHANGE"):
+            raise ValueError(f"Expected a CHANGE message. Got {message}.")
+
+        action = message[first + 1:second]
+        if (action == "SWAP"):
+            return action
+
+        x, y = action.split(",")
+        x, y = int(x), int(y)
+        char = message[second + 1 + x * (self._board_size + 1) + y]
+        self.set_tile_colour(x, y, Colour.from_char(char))
+        return (x, y)
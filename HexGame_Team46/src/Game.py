@@ -1,26 +1,32 @@
 from sys import stderr
 from time import time_ns as time
+from os import getpid
 from os.path import realpath, sep
-from os.path import exists
 from datetime import datetime
 from pathlib import Path
 
 from Colour import Colour
 from Board import Board
+from BitBoard import BitBoard
 from Move import Move
 from Protocol import Protocol
+from LocalProtocol import LocalProtocol
 from EndState import EndState
+from LogWriter import LogWriter
 
 
 class Game():
     """This class describes a game of Hex."""
 
-    # the maximum time allocated for a match per player
+    # the default time allocated for a match per player; see time_limit
     # 5 minutes in nanoseconds (min * s/min * ns/s)
     MAXIMUM_TIME = 5 * 60 * 10**9
     # 1 second in nanoseconds
     # MAXIMUM_TIME = 10**9
 
+    # logs created by this process, to keep log names unique
+    _log_count = 0
+
     def __init__(
         self,
         board_size=11,
@@ -36,10 +42,21 @@ class Game():
         log=True,
         print_protocol=False,
         kill_bots=True,
-        silent_bots=True
+        silent_bots=True,
+        bitboard=False,
+        log_flush_interval=None,
+        log_thread=False,
+        log_dir=None,
+        time_limit=MAXIMUM_TIME,
+        increment=0,
+        move_limit=None,
+        send_clock=False
     ):
         self._turn = 1  # current turn count
-        self._board = Board(board_size)
+        if (bitboard):
+            self._board = BitBoard(board_size)
+        else:
+            self._board = Board(board_size)
         self._player = Colour.RED  # current player
         self._start_time = 0  # used to calculate time elapsed
         self._has_swapped = False  # pie rule
@@ -48,20 +65,41 @@ class Game():
             Colour.RED: {
                 'name': None,
                 'run string': None,
+                'agent': None,
                 'turns': 0,
-                'time': 0
+                'time': 0,
+                'clock': time_limit
             },
             Colour.BLUE: {
                 'name': None,
                 'run string': None,
+                'agent': None,
                 'turns': 0,
-                'time': 0
+                'time': 0,
+                'clock': time_limit
             }
         }
-        self._players[Colour.RED]['name'] = player1['name']
-        self._players[Colour.RED]['run string'] = player1['run string']
-        self._players[Colour.BLUE]['name'] = player2['name']
-        self._players[Colour.BLUE]['run string'] = player2['run string']
+        # a player is either a run string for a socket agent, or an
+        # Agent object that is called in this process
+        for colour, player in ((Colour.RED, player1), (Colour.BLUE, player2)):
+            self._players[colour]['name'] = player['name']
+            self._players[colour]['run string'] = player.get('run string')
+            self._players[colour]['agent'] = player.get('agent')
+
+        # Protocol for socket agents only, LocalProtocol otherwise
+        self._protocol = Protocol
+        if (player1.get('agent') is not None or
+                player2.get('agent') is not None):
+            self._protocol = LocalProtocol()
+
+        # time controls, in nanoseconds: each player's clock starts at
+        # time_limit and gains increment after every move, and no move
+        # may take longer than move_limit
+        self._time_limit = time_limit
+        self._increment = increment
+        self._move_limit = move_limit
+        # whether START and CHANGE messages carry the clocks
+        self._send_clock = send_clock
 
         self._kill_bots = kill_bots
         self._silent_bots = silent_bots
@@ -69,8 +107,13 @@ class Game():
         self._verbose = verbose
         self._print_protocol = print_protocol
         self._log = log
+        self._log_flush_interval = log_flush_interval
+        self._log_thread = log_thread
+        self._log_dir = log_dir
         self._start_log()
 
+        self._results = None  # filled in when the game ends
+
     def run(self):
         """Runs the match."""
         try:
@@ -94,8 +137,10 @@ class Game():
 
         # connect to the agents
         self._start_protocol(
+            self._players[Colour.RED]['agent'] or
             self._players[Colour.RED]['run string'],
             self._players[Colour.RED]['name'],
+            self._players[Colour.BLUE]['agent'] or
             self._players[Colour.BLUE]['run string'],
             self._players[Colour.BLUE]['name']
         )
@@ -104,47 +149,77 @@ class Game():
             self._end_game(EndState.TIMEOUT)
             return
 
-        # start the game
+        self._start_match()
+
+        end_state = None
+        while (end_state is None and not self._board.has_ended()):
+            # get a move from the agents
+            answer, move_time = self._protocol.get_message(
+                self._player,
+                self._get_time_left(),
+                self._print_protocol
+            )
+            end_state = self._play_turn(answer, move_time)
+
+        if (end_state is None):
+            end_state = EndState.WIN
+        self._end_game(end_state)
+
+    def _start_match(self):
+        """Sends the start message and starts the match clock."""
+
+        start_suffix = ""
+        if (self._send_clock):
+            start_suffix = (
+                f";{self._time_limit // 10**6}," +
+                f"{self._increment // 10**6}," +
+                f"{(self._move_limit or 0) // 10**6}"
+            )
+
         self._send_message(
             verbose_message=("Started game of Hex. Board is " +
                              f"{self._board.get_size()}x" +
                              f"{self._board.get_size()}."),
             protocol_message=f"START;{self._board.get_size()};",
-            start=True
+            start=True,
+            start_suffix=start_suffix
         )
 
         self._start_time = time()
-        end_state = EndState.WIN
 
-        while (not self._board.has_ended()):
-            # get a move from the agents
-            m, move_time = self._get_move()
+    def _play_turn(self, answer, move_time):
+        """Plays the answer received from the current agent. Returns the
+        end state if the answer ended the match, None otherwise.
+        """
 
-            # This message is sent after reading a move because it
-            # is a time-consuming operation. Changing the order
-            # will decrease the accuracy with which move time is
-            # recorded.
+        m = self._get_move(answer, move_time)
+
+        # This message is sent after reading a move because it
+        # is a time-consuming operation. Changing the order
+        # will decrease the accuracy with which move time is
+        # recorded. The board is only rendered if it is printed.
+        if (self._verbose):
             self._send_message(
                 verbose_message=self._board.print_board(bnf=False)
             )
 
-            # timeout
-            if (move_time == -1):
-                end_state = EndState.TIMEOUT
-                self._players[self._player]['time'] = Game.MAXIMUM_TIME
-                break
-
-            # illegal move
-            if (not m.is_valid_move(self)):
-                end_state = EndState.BAD_MOVE
-                self._flip_turn(move_time)
-                break
+        # timeout
+        if (move_time == -1):
+            self._players[self._player]['time'] += self._get_time_left()
+            self._players[self._player]['clock'] = 0
+            return EndState.TIMEOUT
 
-            # If all checks passed, proceed normally
-            self._make_move(m)
+        # illegal move
+        if (not m.is_valid_move(self)):
             self._flip_turn(move_time)
+            return EndState.BAD_MOVE
 
-        self._end_game(end_state)
+        # If all checks passed, proceed normally. The clock is charged
+        # first so that the change message carries the new time.
+        self._players[self._player]['clock'] += self._increment - move_time
+        self._make_move(m)
+        self._flip_turn(move_time)
+        return None
 
     def _make_move(self, m):
         """Performs a valid move on the board, then prints its
@@ -171,7 +246,13 @@ class Game():
         verbose_message = (
             f"{self._players[self._player]['name']} {verbose_message}"
         )
-        protocol_message += f"{self._board.print_board()};{next_player}\n"
+        protocol_message += f"{self._board.print_board()};{next_player}"
+        if (self._send_clock):
+            protocol_message += (
+                f";{self._players[Colour.RED]['clock'] // 10**6}," +
+                f"{self._players[Colour.BLUE]['clock'] // 10**6}"
+            )
+        protocol_message += "\n"
 
         self._send_message(verbose_message, protocol_message)
 
@@ -189,10 +270,12 @@ class Game():
         self,
         verbose_message="",
         protocol_message="",
-        start=False
+        start=False,
+        start_suffix=""
     ):
         """Sends messages to the shell or the agents through
         standardised channels. This does not include CSV logging.
+        Start messages get each agent's colour, then start_suffix.
         """
 
         if (self._verbose and verbose_message != ""):
@@ -200,40 +283,42 @@ class Game():
 
         if (protocol_message != ""):
             if (start):
-                Protocol.send_message(
-                    Colour.RED, f"{protocol_message}R\n",
+                self._protocol.send_message(
+                    Colour.RED, f"{protocol_message}R{start_suffix}\n",
                     verbose=self._print_protocol
                 )
-                Protocol.send_message(
-                    Colour.BLUE, f"{protocol_message}B\n"
+                self._protocol.send_message(
+                    Colour.BLUE, f"{protocol_message}B{start_suffix}\n"
                 )
             else:
-                Protocol.send_message(
+                self._protocol.send_message(
                     Colour.RED, protocol_message,
                     verbose=self._print_protocol
                 )
-                Protocol.send_message(
+                self._protocol.send_message(
                     Colour.BLUE, protocol_message
                 )
 
-    def _get_move(self):
-        """Receives a move from the currently playing agent.
-
-        Returns a tuple (move, time). move is a Move object, and
-        time is either an integer representing the time taken in
-        nanoseconds, or False if the agent times out. Snapshot
-        error is less than 1/100s, but it reflects in the logs.
-        The default agent is sometimes too fast to be recorded.
+    def _get_time_left(self):
+        """Returns the time the current player has for this move in
+        nanoseconds: what is left on their clock, up to the move limit.
         """
 
-        time_left = Game.MAXIMUM_TIME - self._players[self._player]['time']
-        time_left = max(time_left, 0)
+        time_left = max(self._players[self._player]['clock'], 0)
+        if (self._move_limit is not None):
+            time_left = min(time_left, self._move_limit)
+        return time_left
 
-        answer, move_time = Protocol.get_message(
-            self._player,
-            time_left,
-            self._print_protocol
-        )
+    def _get_move(self, answer, move_time):
+        """Reads the answer received from the currently playing agent
+        and logs it.
+
+        Returns a Move object. move_time is either an integer
+        representing the time taken in nanoseconds, or -1 if the
+        agent timed out. Snapshot error is less than 1/100s, but it
+        reflects in the logs. The default agent is sometimes too fast
+        to be recorded.
+        """
 
         move, log_message = None, 0
         try:
@@ -269,10 +354,10 @@ class Game():
             move = Move(self._player, -2, -2)
 
         self._write_log(log_message)
-        return (move, move_time)
+        return move
 
     def _swap(self):
-        """Swaps the players' colours in Game and in Protocol."""
+        """Swaps the players' colours in Game and in the protocol."""
 
         self._players[Colour.RED], self._players[Colour.BLUE] = (
             self._players[Colour.BLUE], self._players[Colour.RED]
@@ -281,7 +366,7 @@ class Game():
         self._has_swapped = True
         self._player = Colour.opposite(self._player)
 
-        Protocol.swap()
+        self._protocol.swap()
 
     def _flip_turn(self, move_time):
         """Increments the statistics of the current player, then
@@ -300,9 +385,10 @@ class Game():
         """
 
         # print the board again
-        self._send_message(
-            verbose_message=self._board.print_board(bnf=False)
-        )
+        if (self._verbose):
+            self._send_message(
+                verbose_message=self._board.print_board(bnf=False)
+            )
 
         # calculate total time elapsed
         total_time = time() - self._start_time
@@ -408,6 +494,7 @@ class Game():
         self._write_log(log_message)
 
         if (self._log):
+            self._log_writer.close()
             print(f"Saved log to {self._log_path}")
 
         # short-form results; easier to read than verbose option
@@ -424,33 +511,59 @@ class Game():
         )
         print(final_message, file=stderr)
 
+        # the same results for callers that run many games
+        winner = None
+        if (status is not None):
+            winner = self._players[self._player]['name']
+        self._results = {
+            'status': EndState.get_text(status),
+            'winner': winner,
+            'swapped': self._has_swapped,
+            'turns': self._turn,
+            'time': total_time,
+            'players': {
+                self._players[colour]['name']: {
+                    'colour': colour.get_char(),
+                    'turns': self._players[colour]['turns'],
+                    'time': self._players[colour]['time']
+                }
+                for colour in Colour
+            }
+        }
+
         # close communications
-        Protocol.close(
+        self._protocol.close(
             kill_children=self._kill_bots,
             verbose=self._print_protocol
         )
 
+        # CPU time is only known once the agents are closed; None where
+        # it could not be measured
+        for colour in Colour:
+            self._results['players'][self._players[colour]['name']][
+                'cpu time'] = self._protocol.get_cpu_time(colour)
+
     def _start_protocol(self, s1, name1, s2, name2):
         """Sets up the TCP server, then starts the agents and
         connects to them. If either connection fails, the game
-        will not start.
+        will not start. In-process agents are registered directly.
         """
-        Protocol.start()
+        self._protocol.start()
 
-        self._has_connected = Protocol.accept_connection(
-            s1, name1, Game.MAXIMUM_TIME,
+        self._has_connected = self._protocol.accept_connection(
+            s1, name1, self._time_limit,
             self._silent_bots, self._print_protocol
         )
         if (not self._has_connected):
-            self._players[Colour.RED]['time'] = Game.MAXIMUM_TIME
+            self._players[Colour.RED]['time'] = self._time_limit
             return
 
-        self._has_connected = Protocol.accept_connection(
-            s2, name2, Game.MAXIMUM_TIME,
+        self._has_connected = self._protocol.accept_connection(
+            s2, name2, self._time_limit,
             self._silent_bots, self._print_protocol
         )
         if (not self._has_connected):
-            self._players[Colour.BLUE]['time'] = Game.MAXIMUM_TIME
+            self._players[Colour.BLUE]['time'] = self._time_limit
             self._player = self._player.opposite()
 
     def _start_log(self):
@@ -463,32 +576,49 @@ class Game():
         log_path = sep.join(log_path.split(sep)[:-2])
         log_path += f"{sep}logs{sep}"
 
+        # logs can be sharded into a subdirectory, which may contain
+        # date codes such as %Y-%m-%d
+        now = datetime.now()
+        if (self._log_dir is not None):
+            log_path += now.strftime(self._log_dir) + sep
+
         # create the log directory if it doesn't exist
         Path(log_path).mkdir(parents=True, exist_ok=True)
 
-        # create a new log file
-        self._log_path = log_path + "log.csv"
-        idx = 1
-        while exists(self._log_path):
-            self._log_path = log_path + f"log{idx}.csv"
-            idx += 1
+        # Create a new log file. The time, process id and a counter make
+        # the name unique without looking at the other logs, and the file
+        # is only created if it does not exist, so parallel engines can
+        # never share one. The file stays open until the game ends and
+        # writes are buffered.
+        stamp = now.strftime("%Y%m%d-%H%M%S")
+        while (True):
+            Game._log_count += 1
+            self._log_path = (
+                log_path + f"log-{stamp}-{getpid()}-{Game._log_count}.csv"
+            )
+            try:
+                self._log_writer = LogWriter(
+                    self._log_path, self._log_flush_interval,
+                    self._log_thread
+                )
+                break
+            except FileExistsError:
+                continue
 
         # submit the start message
-        with open(self._log_path, "w") as f:
-            f.write(f"Start log at {datetime.now()}\n")
-            f.write(
-                f"Board is {self._board.get_size()}x" +
-                f"{self._board.get_size()}.\n"
-            )
-            f.write("No,Player,X,Y,Time\n")
+        self._log_writer.write(
+            f"Start log at {now}\n" +
+            f"Board is {self._board.get_size()}x" +
+            f"{self._board.get_size()}.\n" +
+            "No,Player,X,Y,Time\n"
+        )
 
     def _write_log(self, message):
         """Writes the specified message and a newline to the log file."""
         if (not self._log):
             return
 
-        with open(self._log_path, "a") as f:
-            f.write(message + "\n")
+        self._log_writer.write(message + "\n")
 
     def get_board(self):
         return self._board
@@ -499,6 +629,12 @@ class Game():
     def get_turn(self):
         return self._turn
 
+    def get_results(self):
+        """Returns a dict with the outcome of the finished game, or None if
+        it has not ended.
+        """
+        return self._results
+
     @staticmethod
     def ns_to_s(t):
         """Method for standardised nanosecond to second conversion."""
@@ -0,0 +1,88 @@
+import socket
+from time import time_ns
+
+
+class LineReader():
+    """Buffered reader of newline-terminated messages from a socket.
+
+    TCP may split one message over several reads or join several messages
+    into one, so bytes are buffered until a full line is available, and
+    anything after it is kept for the next call. A message longer than
+    the maximum length is cut at the maximum, and the rest of it is
+    dropped rather than read as further messages.
+    """
+
+    # longest message accepted, newline excluded
+    MAX_LENGTH = 64 * 1024
+
+    def __init__(self, conn, max_length=MAX_LENGTH):
+        super().__init__()
+
+        self._conn = conn
+        self._max_length = max_length
+        self._buffer = bytearray()
+        # whether the rest of a cut message is still to be dropped
+        self._skipping = False
+
+    def read_message(self, timeout_ns=None):
+        """Returns the next message as a string, without its newline.
+
+        Raises socket.timeout if no full message arrives within timeout_ns
+        nanoseconds; bytes read so far stay buffered. If the connection
+        closes or is reset, whatever is left in the buffer is returned, so
+        an empty string means no more messages. A message longer than the
+        maximum length is cut at the maximum, and everything up to its
+        newline is dropped.
+        """
+
+        deadline = None
+        if (timeout_ns is not None):
+            deadline = time_ns() + timeout_ns
+
+        while (True):
+            if (self._skipping):
+                end = self._buffer.find(b"\n")
+                if (end == -1):
+                    del self._buffer[:]
+                else:
+                    del self._buffer[:end + 1]
+                    self._skipping = False
+
+            if (not self._skipping):
+                # only a newline within the maximum length ends a message
+                end = self._buffer.find(b"\n", 0, self._max_length + 1)
+                if (end != -1):
+                    return self._pop(end, end + 1)
+
+                if (len(self._buffer) > self._max_length):
+                    self._skipping = True
+                    return self._pop(self._max_length, self._max_length)
+
+            if (deadline is not None):
+                time_left = deadline - time_ns()
+                if (time_left <= 0):
+                    raise socket.timeout("timed out")
+                self._conn.settimeout(time_left/10**9)
+
+            try:
+                data = self._conn.recv(4096)
+                if (deadline is not None):
+                    self._conn.settimeout(socket.getdefaulttimeout())
+            except ConnectionError:
+                # a reset connection still delivers what it sent before
+                if (len(self._buffer) == 0):
+                    raise
+                data = b""
+
+            if (not data):
+                return self._pop(len(self._buffer), len(self._buffer))
+            self._buffer += data
+
+    def _pop(self, end, skip):
+        """Removes and returns the first end bytes of the buffer, also
+        dropping the bytes up to skip.
+        """
+
+        message = self._buffer[:end].decode("utf-8", errors="replace")
+        del self._buffer[:skip]
+        return message
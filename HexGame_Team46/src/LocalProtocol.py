@@ -0,0 +1,154 @@
+from time import time_ns
+
+from Colour import Colour
+from Protocol import Protocol
+from SocketAgent import SocketAgent
+
+
+class LocalProtocol():
+    """Handles communication between the engine and in-process agents.
+
+    It has the same interface as Protocol, so Game can use either, but
+    messages become direct calls on Agent objects instead of text on a
+    socket. Socket agents are wrapped in a SocketAgent, so one match can
+    mix both kinds. The server socket is only opened if a socket agent is
+    used.
+    """
+
+    def __init__(self):
+        super().__init__()
+
+        self.s = None
+        self.port = None
+        self.agents = {Colour.RED: {}, Colour.BLUE: {}}
+
+    def start(self):
+        """Nothing to set up until a socket agent connects."""
+        pass
+
+    def accept_connection(
+        self,
+        agent,
+        name,
+        timeout_ns=30*10**9,
+        silent=True,
+        verbose=False
+    ):
+        """Registers the given Agent object. If agent is a run string, the
+        agent is started and wrapped in a SocketAgent instead. Returns True
+        if the agent is ready, False otherwise.
+        """
+
+        # determine the colour of the new agent
+        if len(self.agents[Colour.RED].keys()) == 0:
+            colour = Colour.RED
+        elif len(self.agents[Colour.BLUE].keys()) == 0:
+            colour = Colour.BLUE
+        else:
+            raise ValueError("Too many agents specified.")
+
+        self.agents[colour]['name'] = name
+        self.agents[colour]['agent'] = agent
+
+        if (isinstance(agent, str)):
+            if (self.s is None):
+                self.s, self.port = Protocol.listen(
+                    Protocol.HOST, Protocol.PORT
+                )
+            agent = SocketAgent(agent)
+            self.agents[colour]['agent'] = agent
+            return agent.connect(self.s, name, timeout_ns, silent, verbose)
+
+        if verbose:
+            print(f"Connected {name} in process")
+        return True
+
+    def get_message(self, colour, timeout_ns=30*10**9, verbose=False):
+        """Asks the given colour agent for its move. Returns the move as
+        protocol text and the time taken, or ("NO MESSAGE", -1) if the
+        agent failed or took longer than the given time.
+        """
+
+        x = self.agents[colour]
+        move_time = time_ns()
+        try:
+            answer = x['agent'].choose_move(timeout_ns)
+        except Exception as e:
+            answer = None
+            if verbose:
+                print(f"{x['name']} raised an exception: {e}")
+        move_time = time_ns() - move_time
+
+        if (answer is None or move_time > timeout_ns):
+            if verbose:
+                print(f"{x['name']} timed out. Nothing received.")
+            return ("NO MESSAGE", -1)
+
+        if (isinstance(answer, tuple)):
+            answer = f"{answer[0]},{answer[1]}"
+
+        if verbose:
+            print(
+                f"Received {answer.strip()} from {x['name']} in " +
+                f"~{int(move_time/10**4)/10**5}s."
+            )
+
+        return (answer, move_time)
+
+    def send_message(self, colour, message, verbose=False):
+        """Passes the specified protocol message to the specified colour
+        agent as the matching call. The time control of START and the
+        clocks of CHANGE are only passed on if the message has them.
+        """
+
+        x = self.agents[colour]
+        data = message.strip().split(";")
+        try:
+            if (data[0] == "START"):
+                args = [int(data[1]), data[2]]
+                if (len(data) > 3):
+                    args.append(tuple(int(i) for i in data[3].split(",")))
+                x['agent'].start(*args)
+            elif (data[0] == "CHANGE"):
+                move = data[1]
+                if (move != "SWAP"):
+                    move = tuple(int(i) for i in move.split(","))
+                args = [move, data[2], data[3]]
+                if (len(data) > 4):
+                    args.append(tuple(int(i) for i in data[4].split(",")))
+                x['agent'].on_change(*args)
+            elif (data[0] == "END"):
+                x['agent'].end(data[1] if len(data) > 1 else "None")
+            if verbose:
+                print("Sent", message, end="")
+
+        except Exception:
+            if verbose:
+                print(f"Failed to send {message.strip()} to {x['name']}.")
+
+    def swap(self):
+        """Switches the colours of the two agents."""
+
+        self.agents[Colour.RED], self.agents[Colour.BLUE] = \
+            self.agents[Colour.BLUE], self.agents[Colour.RED]
+
+    def get_cpu_time(self, colour):
+        """Agents in this process have no CPU time of their own."""
+        return None
+
+    def close(self, kill_children=True, verbose=False):
+        """Closes the agents and, if it was opened, the server socket."""
+
+        for colour in Colour:
+            x = self.agents[colour]
+            if (len(x.keys()) == 0):
+                continue
+
+            try:
+                x['agent'].close(kill_children)
+            except Exception as e:
+                if (verbose):
+                    print(f"Couldn't close {x['name']}. Exception: {e}")
+
+        if (self.s is not None):
+            self.s.close()
@@ -0,0 +1,263 @@
+"""This script collects match logs into one SQLite database.
+
+Every csv log found is parsed line by line and added to the database,
+once; logs that are already in it are skipped, so the same directory can
+be ingested again as new games are played. Queries then run on indexed
+tables instead of rescanning every log. Some summaries are printed at the
+end.
+
+Possible arguments:
+* "db=path" sets the database file. Defaults to logs/logs.db.
+* Any other argument is a log file or a directory to search for logs.
+Defaults to the logs directory.
+"""
+import sqlite3
+from os.path import isdir, realpath, sep
+from pathlib import Path
+from sys import argv
+
+
+class LogStore():
+    """This class describes a database of match logs.
+
+    games has one row per log: the board size, the players in the order
+    they started, the winner, the result, whether the pie rule was used,
+    and the totals. moves has one row per move, with swaps stored as
+    -1,-1 and illegal messages as -2,-2, like Move. players has the
+    totals of each player per game.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS games (
+            id INTEGER PRIMARY KEY,
+            path TEXT UNIQUE NOT NULL,
+            started TEXT,
+            board_size INTEGER,
+            first TEXT,
+            second TEXT,
+            winner TEXT,
+            result TEXT,
+            swapped INTEGER,
+            turns INTEGER,
+            time INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS moves (
+            game INTEGER NOT NULL REFERENCES games(id),
+            turn INTEGER NOT NULL,
+            player TEXT NOT NULL,
+            x INTEGER NOT NULL,
+            y INTEGER NOT NULL,
+            time INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS players (
+            game INTEGER NOT NULL REFERENCES games(id),
+            player TEXT NOT NULL,
+            turns INTEGER NOT NULL,
+            time INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS games_winner ON games(winner);
+        CREATE INDEX IF NOT EXISTS games_result ON games(result);
+        CREATE INDEX IF NOT EXISTS games_board_size ON games(board_size);
+        CREATE INDEX IF NOT EXISTS moves_game ON moves(game);
+        CREATE INDEX IF NOT EXISTS moves_player_time ON moves(player, time);
+        CREATE INDEX IF NOT EXISTS players_player ON players(player);
+    """
+
+    def __init__(self, path):
+        super().__init__()
+
+        self._db = sqlite3.connect(path)
+        self._db.executescript(LogStore.SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def ingest(self, paths):
+        """Adds the logs at the given paths, and every csv log under any
+        directory among them. Logs already in the store are skipped.
+        Returns the number of logs added.
+        """
+
+        added = 0
+        for path in paths:
+            if (isdir(path)):
+                files = sorted(Path(path).rglob("*.csv"))
+            else:
+                files = [Path(path)]
+
+            for file in files:
+                if (self.ingest_file(str(file.resolve()))):
+                    added += 1
+        return added
+
+    def ingest_file(self, path):
+        """Adds one log, unless it is already in the store. Returns True if
+        it was added.
+        """
+
+        known = self._db.execute(
+            "SELECT 1 FROM games WHERE path = ?", (path,)
+        ).fetchone()
+        if (known is not None):
+            return False
+
+        with self._db, open(path) as f:
+            game = self._db.execute(
+                "INSERT INTO games (path) VALUES (?)", (path,)
+            ).lastrowid
+            summary = {'players': []}
+            self._db.executemany(
+                "INSERT INTO moves VALUES (?, ?, ?, ?, ?, ?)",
+                LogStore.parse(f, game, summary)
+            )
+            self._db.execute(
+                "UPDATE games SET started = ?, board_size = ?, first = ?, "
+                "second = ?, winner = ?, result = ?, swapped = ?, "
+                "turns = ?, time = ? WHERE id = ?",
+                (
+                    summary.get('started'), summary.get('board size'),
+                    summary.get('first'), summary.get('second'),
+                    summary.get('winner'), summary.get('result'),
+                    summary.get('swapped'), summary.get('turns'),
+                    summary.get('time'), game
+                )
+            )
+            self._db.executemany(
+                "INSERT INTO players VALUES (?, ?, ?, ?)",
+                [(game,) + player for player in summary['players']]
+            )
+        return True
+
+    def parse(lines, game, summary):
+        """Yields a (game, turn, player, x, y, time) row for every move in
+        the given log lines, and fills summary with the rest of the log.
+        """
+
+        for line in lines:
+            line = line.strip()
+            if (line.startswith("Start log at ")):
+                summary['started'] = line[len("Start log at "):]
+                continue
+            if (line.startswith("Board is ")):
+                summary['board size'] = int(line[len("Board is "):]
+                                            .split("x")[0])
+                continue
+
+            fields = line.split(",")
+            if (len(fields) < 4 or not fields[0].isdigit()):
+                # column names, blank lines and anything unknown
+                continue
+
+            turn, player = int(fields[0]), fields[1]
+            if (turn > 0):
+                if (fields[2] == "-1"):
+                    x, y = -1, -1
+                elif (fields[2] == "-2"):
+                    x, y = -2, -2
+                else:
+                    x, y = int(fields[2]), int(fields[3])
+                if (turn == 1):
+                    summary['first'] = player
+                yield (game, turn, player, x, y, int(fields[4]))
+
+            elif (fields[2] == "End"):
+                if (player != "None"):
+                    summary['winner'] = player
+                summary['result'] = fields[3]
+                if (len(fields) > 4):
+                    summary['swapped'] = int(fields[4] == "True")
+
+            elif (player == "Total"):
+                summary['turns'] = int(fields[2])
+                summary['time'] = int(fields[3])
+
+            else:
+                summary['players'].append(
+                    (player, int(fields[2]), int(fields[3]))
+                )
+                if (player != summary.get('first')):
+                    summary['second'] = player
+
+    def query(self, sql, parameters=()):
+        """Returns all rows of the given SQL query."""
+        return self._db.execute(sql, parameters).fetchall()
+
+    def move_time_percentile(self, percentile=99):
+        """Returns (player, move time) pairs with the given percentile of
+        each player's move times, in nanoseconds. Timeouts are left out.
+        """
+
+        return self.query(
+            """
+            SELECT player, time FROM (
+                SELECT player, time,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY player ORDER BY time
+                    ) AS rank,
+                    COUNT(*) OVER (PARTITION BY player) AS count
+                FROM moves WHERE time >= 0
+            )
+            WHERE rank = MAX(1, CAST(
+                (count * ? + 99) / 100 AS INTEGER
+            ))
+            ORDER BY player
+            """,
+            (percentile,)
+        )
+
+    def win_rates(self):
+        """Returns (player, played, won) for every player."""
+
+        return self.query(
+            """
+            SELECT p.player, COUNT(*), SUM(g.winner = p.player)
+            FROM players p JOIN games g ON g.id = p.game
+            GROUP BY p.player ORDER BY p.player
+            """
+        )
+
+    def win_rates_by_swap(self):
+        """Returns (swapped, games, won by the player who moved first) for
+        games with and without the pie rule.
+        """
+
+        return self.query(
+            """
+            SELECT swapped, COUNT(*), SUM(winner = first)
+            FROM games WHERE swapped IS NOT NULL
+            GROUP BY swapped ORDER BY swapped
+            """
+        )
+
+
+def main():
+    log_dir = sep.join(realpath(__file__).split(sep)[:-2]) + f"{sep}logs"
+    db_path = f"{log_dir}{sep}logs.db"
+    paths = []
+
+    for argument in argv[1:]:
+        if (argument.startswith("db=")):
+            db_path = argument.split("=", 1)[1]
+        else:
+            paths.append(argument)
+
+    if (len(paths) == 0):
+        paths.append(log_dir)
+
+    store = LogStore(db_path)
+    print(f"Added {store.ingest(paths)} logs to {db_path}.")
+
+    print("\nPlayer  Played  Won  p99 move (s)")
+    p99 = dict(store.move_time_percentile(99))
+    for player, played, won in store.win_rates():
+        print(f"{player}  {played}  {won}  {p99.get(player, 0)/10**9}")
+
+    print("\nSwapped  Games  First player won")
+    for swapped, games, won in store.win_rates_by_swap():
+        print(f"{bool(swapped)}  {games}  {won}")
+
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
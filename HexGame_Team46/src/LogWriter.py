@@ -0,0 +1,108 @@
+import threading
+from queue import Empty, SimpleQueue
+from time import monotonic
+
+
+class LogWriter():
+    """Buffered writer for the log of one match.
+
+    The file is opened once and lines are kept in memory until the buffer
+    is full, the flush interval has passed, or the writer is closed. With
+    threaded=True, writes only queue the text and a background thread does
+    the rest, so logging takes no time from the engine thread.
+
+    The file must not exist yet; FileExistsError is raised otherwise.
+    """
+
+    # characters buffered before they are written to the file
+    BUFFER_SIZE = 64 * 1024
+
+    # queued to ask the writer thread to flush
+    _FLUSH = object()
+
+    def __init__(self, path, flush_interval=None, threaded=False):
+        super().__init__()
+
+        self._file = open(path, "x")
+        self._lines = []
+        self._size = 0
+        # seconds between flushes, or None to flush only when full
+        self._flush_interval = flush_interval
+        self._last_flush = monotonic()
+
+        self._queue = None
+        self._thread = None
+        if (threaded):
+            self._queue = SimpleQueue()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def write(self, text):
+        """Adds text to the log. It reaches the file on the next flush."""
+
+        if (self._queue is not None):
+            self._queue.put(text)
+        else:
+            self._append(text)
+
+    def flush(self):
+        """Writes everything buffered so far to the file. With a writer
+        thread, the flush is queued after the pending writes.
+        """
+
+        if (self._queue is not None):
+            self._queue.put(LogWriter._FLUSH)
+        else:
+            self._flush_file()
+
+    def close(self):
+        """Flushes the log and closes the file, waiting for the writer
+        thread if there is one.
+        """
+
+        if (self._thread is not None):
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        else:
+            self._flush_file()
+
+        self._file.close()
+
+    def _append(self, text):
+        self._lines.append(text)
+        self._size += len(text)
+
+        if (self._size >= LogWriter.BUFFER_SIZE or (
+                self._flush_interval is not None and
+                monotonic() - self._last_flush >= self._flush_interval)):
+            self._flush_file()
+
+    def _flush_file(self):
+        if (len(self._lines) > 0):
+            self._file.write("".join(self._lines))
+            self._lines = []
+            self._size = 0
+        self._file.flush()
+        self._last_flush = monotonic()
+
+    def _run(self):
+        """Writer thread. Waits for text until it gets None, flushing
+        whenever the interval passes without any.
+        """
+
+        while (True):
+            try:
+                text = self._queue.get(timeout=self._flush_interval)
+            except Empty:
+                self._flush_file()
+                continue
+
+            if (text is None):
+                break
+            if (text is LogWriter._FLUSH):
+                self._flush_file()
+            else:
+                self._append(text)
+
+        self._flush_file()
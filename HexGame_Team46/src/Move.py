@@ -27,8 +27,8 @@ class Move():
             return False
 
         # tile is empty and colour corresponds to current player
-        tile = b.get_tiles()[self.x][self.y]
-        return tile.get_colour() is None and colour == self.colour
+        return (b.get_tile_colour(self.x, self.y) is None and
+                colour == self.colour)
 
     def is_swap(self):
         # a swap move is defined as -1,-1
@@ -36,8 +36,7 @@ class Move():
 
     def move(self, b):
         # fill the tile
-        tile = b.get_tiles()[self.x][self.y]
-        tile.set_colour(self.colour)
+        b.set_tile_colour(self.x, self.y, self.colour)
 
     def get_x(self):
         return self.x
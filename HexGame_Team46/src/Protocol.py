@@ -1,33 +1,84 @@
+import os
+import secrets
 import socket
 import subprocess
 from sys import platform, stdout
 from time import time_ns
+from AgentLimits import AgentLimits
 from Colour import Colour
+from LineReader import LineReader
+from Transport import Transport
 import shlex
 
 
 class Protocol():
     """Static class that handles protocol communication between engine and
-    agents. Uses a TCP socket.
+    agents. Uses a TCP socket by default, or another of Transport.TYPES.
     """
 
     HOST = "127.0.0.1"
+    # 0 lets the OS pick a free port, which is then given to the agents
     PORT = 1234
+    # "tcp", "unix" or "socketpair"; the agents get the address to
+    # connect to in the HEX_ADDRESS environment variable
+    TRANSPORT = "tcp"
+    # longest message accepted from an agent; moves are far shorter
+    MAX_MESSAGE_LENGTH = 1024
     s = None
+    port = None
+    address = None
+    # an AgentPool to keep agents between games, or None
+    pool = None
+    # an AgentLimits applied to every agent started, or None
+    limits = None
+    # keep the server open between games, until shutdown is called
+    keep_server = False
     sockets = {Colour.RED: {}, Colour.BLUE: {}}
 
     @staticmethod
     def start():
-        """Sets up a TCP server. The socket reuse address option is
-        enabled because Linux does not close sockets immediately on
-        application exit. This would cause issues with successive
-        matches.
+        """Sets up a server for the chosen transport. For TCP, the socket
+        reuse address option is enabled because Linux does not close
+        sockets immediately on application exit. This would cause issues
+        with successive matches. A socketpair transport needs no server.
         """
 
-        Protocol.s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        Protocol.s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        Protocol.s.bind((Protocol.HOST, Protocol.PORT))
-        Protocol.s.listen()
+        Protocol.sockets = {Colour.RED: {}, Colour.BLUE: {}}
+        if (Protocol.keep_server and Protocol.s is not None):
+            Protocol.drain()
+            return
+
+        Protocol.s, Protocol.address = Transport.listen(
+            Protocol.TRANSPORT, Protocol.HOST, Protocol.PORT
+        )
+        Protocol.port = None
+        if (Protocol.TRANSPORT == "tcp"):
+            Protocol.port = Protocol.s.getsockname()[1]
+
+    @staticmethod
+    def drain():
+        """Closes connections still waiting on the kept server, such as
+        agents of an earlier game that connected too late.
+        """
+
+        Protocol.s.setblocking(False)
+        try:
+            while (True):
+                conn, addr = Protocol.s.accept()
+                conn.close()
+        except OSError:
+            pass
+        finally:
+            Protocol.s.setblocking(True)
+
+    @staticmethod
+    def listen(host, port):
+        """Returns a listening TCP socket bound to the given address, and
+        the port it was bound to.
+        """
+
+        s, address = Transport.listen("tcp", host, port)
+        return s, s.getsockname()[1]
 
     @staticmethod
     def accept_connection(
@@ -42,10 +93,6 @@ class Protocol():
         was made, False otherwise.
         """
 
-        # separate run_s into a list of arguments to be used in a linux shell
-        if (platform != "win32"):
-            run_s = shlex.split(run_s)
-
         # determine the colour of the new agent
         if len(Protocol.sockets[Colour.RED].keys()) == 0:
             colour = Colour.RED
@@ -54,20 +101,123 @@ class Protocol():
         else:
             raise ValueError("Too many agents specified.")
 
+        # reuse an agent left connected by an earlier game
+        if (Protocol.pool is not None):
+            agent = Protocol.pool.take(run_s)
+            if (agent is not None):
+                Protocol.sockets[colour] = dict(
+                    agent, name=name, run_s=run_s,
+                    cpu_start=AgentLimits.get_cpu_time(agent['thread'])
+                )
+                if verbose:
+                    print(f"Reusing {name} at {agent['addr']}")
+                return True
+
+        # start the agent and wait for a connection
+        persistent = Protocol.pool is not None
+        token = None
+        if (Protocol.TRANSPORT == "socketpair"):
+            # the agent inherits its end, so it is connected already; it
+            # says HELLO once it has started instead
+            token = secrets.token_hex(16)
+            conn, agent_end, addr = Transport.pair()
+            t = Protocol.start_agent(
+                run_s, silent, address=addr, pass_fds=[agent_end.fileno()],
+                persistent=persistent, token=token
+            )
+            agent_end.close()
+        else:
+            t = Protocol.start_agent(
+                run_s, silent, Protocol.port, Protocol.address,
+                persistent=persistent
+            )
+            conn, addr = Protocol.wait_connection(
+                Protocol.s, name, timeout_ns, verbose
+            )
+
+        # set up associated arguments
+        Protocol.sockets[colour]['name'] = name
+        Protocol.sockets[colour]['run_s'] = run_s
+        Protocol.sockets[colour]['thread'] = t
+        Protocol.sockets[colour]['conn'] = conn
+        Protocol.sockets[colour]['addr'] = addr
+        Protocol.sockets[colour]['reader'] = LineReader(
+            conn, Protocol.MAX_MESSAGE_LENGTH
+        )
+
+        # wait until the agent has started, so that its start-up is not
+        # timed as part of its first move
+        if (token is not None):
+            if (not Protocol.wait_ready(colour, token, timeout_ns)):
+                conn.close()
+                Protocol.sockets[colour]['conn'] = None
+                if (verbose):
+                    print(f"{name} never said HELLO.")
+                return False
+            if (verbose):
+                print(f"Connected {name} at {addr}")
+
+        # CPU time is counted from here, so start-up is left out of it
+        Protocol.sockets[colour]['cpu_start'] = AgentLimits.get_cpu_time(t)
+
+        return conn is not None
+
+    @staticmethod
+    def start_agent(run_s, silent=True, port=None, address=None,
+                    pass_fds=(), persistent=False, token=None):
+        """Starts a subprocess with the specified string and returns it.
+        The address to connect to is passed in the HEX_ADDRESS environment
+        variable and, for TCP, the port in HEX_PORT. pass_fds are file
+        descriptors the subprocess inherits. If persistent=True, HEX_NEWGAME
+        tells the agent it may play more than one game. A token is passed
+        in HEX_TOKEN, for the agent to send back in a HELLO message.
+        Protocol.limits, if set, is applied to the subprocess before it
+        runs.
+        """
+
+        # separate run_s into a list of arguments to be used in a linux shell
+        if (platform != "win32"):
+            run_s = shlex.split(run_s)
+
         # whether to throw out all output of the agent
         # used to ease the screen clutter during the tournament
         output = stdout
         if (silent):
             output = subprocess.DEVNULL
 
-        # start the agent
-        t = subprocess.Popen(run_s, stdout=output, stderr=output, shell=False)
+        if (address is None and port is not None):
+            address = f"tcp:{Protocol.HOST}:{port}"
+
+        env = None
+        if (address is not None):
+            env = dict(os.environ, HEX_ADDRESS=address)
+            if (port is not None):
+                env['HEX_PORT'] = str(port)
+            if (persistent):
+                env['HEX_NEWGAME'] = "1"
+            if (token is not None):
+                env['HEX_TOKEN'] = token
+
+        preexec_fn = None
+        if (Protocol.limits is not None):
+            preexec_fn = Protocol.limits.preexec()
+
+        return subprocess.Popen(
+            run_s, stdout=output, stderr=output, shell=False, env=env,
+            pass_fds=pass_fds, preexec_fn=preexec_fn
+        )
+
+    @staticmethod
+    def wait_connection(server, name, timeout_ns=30*10**9, verbose=False):
+        """Waits for an agent to connect to the given server socket. Returns
+        the connection and its address, or (None, None) on timeout.
+        """
 
-        # wait for a connection
         try:
-            Protocol.s.settimeout(timeout_ns/10**9)
-            conn, addr = Protocol.s.accept()
-            Protocol.s.settimeout(socket.getdefaulttimeout())
+            server.settimeout(timeout_ns/10**9)
+            conn, addr = server.accept()
+            server.settimeout(socket.getdefaulttimeout())
+            Transport.set_nodelay(conn)
             if verbose:
                 print(f"Connected {name} at {addr}")
         except socket.timeout:
@@ -75,13 +225,20 @@ class Protocol():
             if (verbose):
                 print(f"{name} never connected.")
 
-        # set up associated arguments
-        Protocol.sockets[colour]['name'] = name
-        Protocol.sockets[colour]['thread'] = t
-        Protocol.sockets[colour]['conn'] = conn
-        Protocol.sockets[colour]['addr'] = addr
+        return conn, addr
 
-        return conn is not None
+    @staticmethod
+    def wait_ready(colour, token, timeout_ns=30*10**9):
+        """Waits for the HELLO;token message the given colour agent sends
+        once it has started. Returns True if it arrived in time.
+        """
+
+        try:
+            data = Protocol.sockets[colour]['reader'].read_message(timeout_ns)
+        except (socket.timeout, ConnectionError):
+            return False
+
+        return data.strip() == f"HELLO;{token}"
 
     @staticmethod
     def get_message(colour, timeout_ns=30*10**9, verbose=False):
@@ -90,13 +247,11 @@ class Protocol():
         """
 
         try:
-            Protocol.sockets[colour]['conn'].settimeout(timeout_ns/10**9)
             move_time = time_ns()
-            data = Protocol.sockets[colour]['conn'].recv(1024)
-            move_time = time_ns() - move_time
-            Protocol.sockets[colour]['conn'].settimeout(
-                socket.getdefaulttimeout()
+            data = Protocol.sockets[colour]['reader'].read_message(
+                timeout_ns
             )
+            move_time = time_ns() - move_time
 
         except socket.timeout:
             if verbose:
@@ -120,12 +275,12 @@ class Protocol():
 
         if verbose:
             print(
-                f"Received {data.decode('utf-8').strip()} from " +
+                f"Received {data.strip()} from " +
                 f"{Protocol.sockets[colour]['name']} in " +
                 f"~{int(move_time/10**4)/10**5}s."
             )
 
-        return (data.decode("utf-8"), move_time)
+        return (data, move_time)
 
     @staticmethod
     def send_message(colour, message, verbose=False):
@@ -143,6 +298,15 @@ class Protocol():
                     f"{Protocol.sockets[colour]['name']}."
                 )
 
+    @staticmethod
+    def get_cpu_time(colour):
+        """Returns the CPU time the given colour agent used in the game,
+        in nanoseconds, once the protocol is closed. It is counted from
+        when the agent connected, so it leaves out start-up. Returns None
+        if it could not be measured.
+        """
+        return Protocol.sockets[colour].get('cpu_time')
+
     @staticmethod
     def swap():
         """Switches the colours of the two agents."""
@@ -154,7 +318,9 @@ class Protocol():
     def close(kill_children=True, verbose=False):
         """Closes the connection. If kill_children=True, it will also forcibly
         terminate the agents. Otherwise, it will block the thread until they
-        have terminated on their own.
+        have terminated on their own. With a pool, agents that ask for a new
+        game are kept in it instead. The CPU time each agent used in the
+        game is then available from get_cpu_time.
         """
 
         # close sockets and agents
@@ -163,11 +329,24 @@ class Protocol():
             if (len(x.keys()) == 0):
                 continue
 
+            if (Protocol.pool is not None and x['conn'] is not None and
+                    Protocol.pool.release(x['run_s'], x)):
+                x['cpu_time'] = AgentLimits.cpu_since(
+                    AgentLimits.get_cpu_time(x['thread']), x['cpu_start']
+                )
+                if (verbose):
+                    print(f"Kept {x['name']} at {x['addr']} for a new game")
+                continue
+
             try:
+                # read before the kill, so that tearing the agent down is
+                # not counted
+                x['cpu_time'] = AgentLimits.cpu_since(
+                    AgentLimits.get_cpu_time(x['thread']), x.get('cpu_start')
+                )
                 if (kill_children):
                     x['thread'].kill()
-                else:
-                    x['thread'].wait()
+                x['thread'].wait()
             except Exception as e:
                 if (verbose):
                     print(
@@ -187,11 +366,21 @@ class Protocol():
                         f"{x['name']} connection was already closed.")
 
         # close server
+        if (not Protocol.keep_server):
+            Protocol.shutdown(verbose)
+
+    @staticmethod
+    def shutdown(verbose=False):
+        """Closes the server."""
+
         try:
             Protocol.s.close()
         except AttributeError:
             if (verbose):
                 print("Socket was not open.")
+        Transport.remove(Protocol.address)
+        Protocol.s = None
+        Protocol.address = None
 
 
 if __name__ == "__main__":
@@ -0,0 +1,78 @@
+import socket
+
+from Agent import Agent
+from LineReader import LineReader
+from Protocol import Protocol
+
+
+class SocketAgent(Agent):
+    """Adapter that drives a socket agent through the in-process Agent
+    interface, so LocalProtocol can run it next to Python agents.
+
+    Calls are turned into protocol messages sent over the agent's
+    connection, and choose_move waits for the agent's answer.
+    """
+
+    def __init__(self, run_string):
+        super().__init__()
+
+        self._run_string = run_string
+        self._thread = None
+        self._conn = None
+        self._addr = None
+        self._reader = None
+
+    def connect(self, server, name, timeout_ns=30*10**9, silent=True,
+                verbose=False):
+        """Starts the agent and waits for it to connect to the given server
+        socket. Returns True if the connection was made, False otherwise.
+        """
+
+        self._thread = Protocol.start_agent(
+            self._run_string, silent, server.getsockname()[1]
+        )
+        self._conn, self._addr = Protocol.wait_connection(
+            server, name, timeout_ns, verbose
+        )
+        self._reader = LineReader(self._conn, Protocol.MAX_MESSAGE_LENGTH)
+        return self._conn is not None
+
+    def _send(self, message):
+        self._conn.sendall(bytes(message, "utf-8"))
+
+    def start(self, board_size, colour, time_control=None):
+        message = f"START;{board_size};{colour}"
+        if (time_control is not None):
+            message += ";" + ",".join(str(i) for i in time_control)
+        self._send(message + "\n")
+
+    def on_change(self, move, board, next_player, clocks=None):
+        if (move != "SWAP"):
+            move = f"{move[0]},{move[1]}"
+        message = f"CHANGE;{move};{board};{next_player}"
+        if (clocks is not None):
+            message += ";" + ",".join(str(i) for i in clocks)
+        self._send(message + "\n")
+
+    def end(self, winner):
+        self._send(f"END;{winner}\n")
+
+    def choose_move(self, time_left):
+        """Returns the text the agent sent, or None if it sent nothing in
+        time or the connection failed.
+        """
+
+        try:
+            return self._reader.read_message(time_left)
+        except (socket.timeout, OSError):
+            return None
+
+    def close(self, kill=True):
+        if (self._thread is not None):
+            if (kill):
+                self._thread.kill()
+            else:
+                self._thread.wait()
+
+        if (self._conn is not None):
+            self._conn.close()
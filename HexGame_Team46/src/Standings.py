@@ -0,0 +1,100 @@
+from Game import Game
+
+
+class Standings():
+    """This class describes the combined results of many games, per
+    agent.
+    """
+
+    def __init__(self, names=()):
+        super().__init__()
+
+        self._stats = {}
+        for name in names:
+            self._add(name)
+
+    def _add(self, name):
+        if (name not in self._stats):
+            self._stats[name] = {
+                'played': 0,
+                'won': 0,
+                'lost': 0,
+                'won as red': 0,
+                'won as blue': 0,
+                'turns': 0,
+                'time': 0,
+                # turns and CPU time of the games where it was measured
+                'cpu turns': 0,
+                'cpu time': 0
+            }
+
+    def record(self, red, blue, results):
+        """Adds the results of one game. red and blue are the names of the
+        agents that started as Red and Blue.
+        """
+
+        for name in (red, blue):
+            self._add(name)
+            self._stats[name]['played'] += 1
+
+        if (results is None):
+            return
+
+        for name, player in results['players'].items():
+            self._stats[name]['turns'] += player['turns']
+            self._stats[name]['time'] += player['time']
+            if (player.get('cpu time') is not None):
+                self._stats[name]['cpu turns'] += player['turns']
+                self._stats[name]['cpu time'] += player['cpu time']
+
+        winner = results['winner']
+        if (winner is None):
+            return
+
+        loser = blue if winner == red else red
+        self._stats[winner]['won'] += 1
+        self._stats[loser]['lost'] += 1
+        if (winner == red):
+            self._stats[winner]['won as red'] += 1
+        else:
+            self._stats[winner]['won as blue'] += 1
+
+    def get_standings(self):
+        """Returns a list of (name, stats) pairs, best first."""
+
+        return sorted(
+            self._stats.items(),
+            key=lambda item: (-item[1]['won'], item[1]['lost'], item[0])
+        )
+
+    def print_standings(self):
+        """Prints the standings as a table. Red and Blue refer to the
+        colour each agent started the game with.
+        """
+
+        rows = [("Agent", "Played", "Won", "Lost", "Win %", "Won Red",
+                 "Won Blue", "Mean move (s)", "Mean CPU (s)")]
+        for name, stats in self.get_standings():
+            win_rate = 0
+            if (stats['played'] > 0):
+                win_rate = 100 * stats['won'] / stats['played']
+            mean_move = 0
+            if (stats['turns'] > 0):
+                mean_move = Game.ns_to_s(stats['time'] / stats['turns'])
+            mean_cpu = "-"
+            if (stats['cpu turns'] > 0):
+                mean_cpu = Game.ns_to_s(
+                    stats['cpu time'] / stats['cpu turns']
+                )
+            rows.append((
+                name, stats['played'], stats['won'], stats['lost'],
+                f"{win_rate:.1f}", stats['won as red'],
+                stats['won as blue'], mean_move, mean_cpu
+            ))
+
+        widths = [max(len(str(row[i])) for row in rows)
+                  for i in range(len(rows[0]))]
+        for row in rows:
+            print("  ".join(
+                str(cell).ljust(width) for cell, width in zip(row, widths)
+            ))
@@ -2,7 +2,14 @@ from Colour import Colour
 
 
 class Tile:
-    """The class representation of a tile on a board of Hex."""
+    """The class representation of a tile on a board of Hex.
+
+    A tile made by a Board is a view: its colour and visited status are
+    read from and written to the board's arrays. A tile made without a
+    board keeps them itself.
+    """
+
+    __slots__ = ("x", "y", "colour", "visited", "_board")
 
     # number of neighbours a tile has
     NEIGHBOUR_COUNT = 6
@@ -11,7 +18,7 @@ class Tile:
     I_DISPLACEMENTS = [-1, -1, 0, 1, 1, 0]
     J_DISPLACEMENTS = [0, 1, 1, 0, -1, -1]
 
-    def __init__(self, x, y, colour=None):
+    def __init__(self, x, y, colour=None, board=None):
         super().__init__()
 
         self.x = x
@@ -20,6 +27,8 @@ class Tile:
 
         self.visited = False
 
+        self._board = board
+
     def get_x(self):
         return self.x
 
@@ -27,16 +36,29 @@ class Tile:
         return self.y
 
     def set_colour(self, colour):
-        self.colour = colour
+        if (self._board is None):
+            self.colour = colour
+        else:
+            self._board.set_tile_colour(self.x, self.y, colour)
 
     def get_colour(self):
-        return self.colour
+        if (self._board is None):
+            return self.colour
+        return self._board.get_tile_colour(self.x, self.y)
 
     def visit(self):
-        self.visited = True
+        if (self._board is None):
+            self.visited = True
+        else:
+            self._board.visit_tile(self.x, self.y)
 
     def is_visited(self):
-        return self.visited
+        if (self._board is None):
+            return self.visited
+        return self._board.is_tile_visited(self.x, self.y)
 
     def clear_visit(self):
-        self.visited = False
+        if (self._board is None):
+            self.visited = False
+        else:
+            self._board.visit_tile(self.x, self.y, False)
@@ -0,0 +1,285 @@
+"""This script runs a round-robin tournament of Hex.
+
+Every agent plays every other agent, once with each colour order, and
+games run in parallel on a pool of worker processes. Each game binds
+its own free port, which is passed to its agents in the HEX_PORT
+environment variable, so games never collide. The combined standings
+are printed at the end.
+
+Possible arguments:
+* "agent=name;command" or "a=name;command" adds one agent with the
+given name, that can be run by the given command. At least two agents
+are needed, and names must be unique.
+* "board_size=n" or "b=n" sets the board size.
+* "games=n" or "g=n" sets the number of games per pairing and colour
+order. Defaults to 1.
+* "workers=n" or "w=n" sets the number of worker processes. Defaults
+to one per core.
+* "-async" or "-a" hosts every game in this process on one AsyncServer
+instead of the worker pool. workers then limits the number of games
+played at once.
+* "-reuse" or "-r" keeps agent processes running between the games of
+a worker, for agents that support the NEWGAME extension (see
+AgentPool). It has no effect with -async.
+* "time=s", "increment=s" and "move_time=s" set the time control, as
+in Hex.py. Short time controls play more games in the same time.
+* "-clock" or "-c" sends the clocks to the agents, as in Hex.py.
+* "cpus=n" pins every agent to n CPUs of its own, so agents of games
+played at once do not take CPU time from each other. Each worker gets
+the CPUs for its two agents, and the number of workers is lowered to
+fit the CPUs this process may use. With -async, agents are pinned to
+the CPUs in turn. Needs Linux.
+* "memory=MB" and "cpu_time=s" cap the memory and the CPU time of
+every agent process. An agent over its cap is killed and loses on
+time. Needs Linux.
+* "-log" or "-l" saves every game to a csv file under logs, in a
+directory of its own for this tournament.
+* "log_dir=name" sets that directory instead. It may contain date codes
+such as %Y-%m-%d.
+"""
+import asyncio
+import multiprocessing
+import multiprocessing.util
+import os
+from datetime import datetime
+from sys import argv
+
+from AgentLimits import AgentLimits
+from AgentPool import AgentPool
+from AsyncServer import AsyncServer
+from Game import Game
+from Protocol import Protocol
+from Standings import Standings
+
+
+def start_worker(reuse, limits=None, cpu_sets=None):
+    """Sets up a worker process. With reuse, agents are kept in a pool
+    between the games the worker plays. limits is applied to every agent
+    the worker starts, on CPUs taken from the cpu_sets queue if given.
+    """
+
+    if (reuse):
+        Protocol.pool = AgentPool()
+        # closes the agents left in the pool when the worker exits
+        multiprocessing.util.Finalize(
+            Protocol.pool, Protocol.pool.close, exitpriority=10
+        )
+
+    if (limits is not None):
+        if (cpu_sets is not None):
+            limits.cpus = cpu_sets.get()
+        Protocol.limits = limits
+
+
+def play_game(job):
+    """Plays one game in a worker process. Returns the names of the
+    agents that started as Red and Blue, and the game results.
+    """
+
+    player1, player2, game_args = job
+
+    # let the OS pick a free port for this game
+    Protocol.PORT = 0
+
+    g = Game(player1=player1, player2=player2, **game_args)
+    g.run()
+    return (player1['name'], player2['name'], g.get_results())
+
+
+class Tournament():
+    """This class describes a round-robin tournament between agents."""
+
+    def __init__(self, agents, board_size=11, games=1, workers=None,
+                 log=False, log_dir=None, reuse=False,
+                 time_limit=Game.MAXIMUM_TIME, increment=0, move_limit=None,
+                 send_clock=False, cpus_per_agent=None, memory=None,
+                 cpu_time=None):
+        names = [agent['name'] for agent in agents]
+        if (len(names) < 2):
+            raise ValueError("At least two agents are needed.")
+        if (len(names) != len(set(names))):
+            raise ValueError("Agent names must be unique.")
+
+        self._agents = agents
+        self._games = games
+        self._workers = workers
+        self._reuse = reuse
+
+        # limits for every agent, with the CPUs shared out when run
+        self._limits = None
+        if (cpus_per_agent is not None or memory is not None or
+                cpu_time is not None):
+            self._limits = AgentLimits(
+                cpus_per_agent=cpus_per_agent or 1, memory=memory,
+                cpu_time=cpu_time
+            )
+        self._cpus = None
+        if (cpus_per_agent is not None):
+            self._cpus = sorted(os.sched_getaffinity(0))
+            if (len(self._cpus) < 2 * cpus_per_agent):
+                raise ValueError(
+                    f"{2 * cpus_per_agent} CPUs are needed for a game, " +
+                    f"but only {len(self._cpus)} are available."
+                )
+
+        # one directory for the whole tournament, named when it starts
+        if (log_dir is None):
+            log_dir = f"tournament-%Y%m%d-%H%M%S-{os.getpid()}"
+
+        # the same Game arguments for every game
+        self._game_args = {
+            'board_size': board_size,
+            'log': log,
+            'log_dir': datetime.now().strftime(log_dir),
+            'kill_bots': True,
+            'silent_bots': True,
+            'time_limit': time_limit,
+            'increment': increment,
+            'move_limit': move_limit,
+            'send_clock': send_clock
+        }
+
+        self._standings = Standings(names)
+
+    def schedule(self):
+        """Returns one job per game: every ordered pair of agents, so each
+        pairing is played with both colour orders, repeated games times.
+        """
+
+        jobs = []
+        for red in self._agents:
+            for blue in self._agents:
+                if (red is blue):
+                    continue
+                for i in range(self._games):
+                    jobs.append((red, blue, self._game_args))
+        return jobs
+
+    def run(self):
+        """Runs every game on the worker pool and returns the standings."""
+
+        jobs = self.schedule()
+        workers = self._workers or os.cpu_count()
+
+        # a separate set of CPUs for the two agents of each worker
+        cpu_sets = None
+        if (self._cpus is not None):
+            per_worker = 2 * self._limits.cpus_per_agent
+            workers = min(workers, len(self._cpus) // per_worker)
+            cpu_sets = multiprocessing.Queue()
+            for i in range(workers):
+                cpu_sets.put(self._cpus[i * per_worker:(i + 1) * per_worker])
+
+        with multiprocessing.Pool(
+            workers, start_worker, (self._reuse, self._limits, cpu_sets)
+        ) as pool:
+            for red, blue, results in pool.imap_unordered(play_game, jobs):
+                self._record(red, blue, results)
+
+            # let the workers exit on their own, which runs their
+            # finalizers, before the pool is terminated
+            pool.close()
+            pool.join()
+
+        return self.get_standings()
+
+    def run_async(self):
+        """Runs every game on one AsyncServer and returns the standings."""
+
+        asyncio.run(self._play_async())
+        return self.get_standings()
+
+    async def _play_async(self):
+        if (self._limits is not None):
+            self._limits.cpus = self._cpus
+        server = AsyncServer(limits=self._limits)
+        await server.start()
+        try:
+            jobs = self.schedule()
+            matches = [
+                dict(game_args, player1=red, player2=blue)
+                for red, blue, game_args in jobs
+            ]
+            games = await server.play_all(
+                matches, self._workers or os.cpu_count()
+            )
+        finally:
+            await server.close()
+
+        for (red, blue, _), results in zip(jobs, games):
+            self._record(red['name'], blue['name'], results)
+
+    def _record(self, red, blue, results):
+        """Adds the results of one game to the standings."""
+        self._standings.record(red, blue, results)
+
+    def get_standings(self):
+        """Returns a list of (name, stats) pairs, best first."""
+        return self._standings.get_standings()
+
+    def print_standings(self):
+        """Prints the standings as a table."""
+        self._standings.print_standings()
+
+
+def main():
+    board_size = 11
+    games = 1
+    workers = None
+    log = ("-l" in argv or "-log" in argv)
+    use_async = ("-a" in argv or "-async" in argv)
+    log_dir = None
+    reuse = ("-r" in argv or "-reuse" in argv)
+    send_clock = ("-c" in argv or "-clock" in argv)
+    time_control = {}
+    limits = {}
+    agents = []
+
+    for argument in argv[1:]:
+        key, _, value = argument.partition("=")
+        try:
+            if (key in ("agent", "a")):
+                name, run_string = value.split(";")
+                agents.append({"name": name, "run string": run_string})
+            elif (key in ("board_size", "b")):
+                board_size = int(value)
+            elif (key in ("games", "g")):
+                games = int(value)
+            elif (key in ("workers", "w")):
+                workers = int(value)
+            elif (key == "log_dir"):
+                log_dir = value
+            elif (key in ("time", "increment", "move_time")):
+                time_control[key] = int(float(value) * 10**9)
+            elif (key == "cpus"):
+                limits["cpus_per_agent"] = int(value)
+            elif (key == "memory"):
+                limits["memory"] = int(float(value) * 2**20)
+            elif (key == "cpu_time"):
+                limits["cpu_time"] = int(float(value))
+        except Exception:
+            print(f"ERROR: Argument '{argument}' is not valid. Aborted.")
+            return
+
+    try:
+        tournament = Tournament(
+            agents, board_size, games, workers, log, log_dir, reuse,
+            time_control.get("time", Game.MAXIMUM_TIME),
+            time_control.get("increment", 0),
+            time_control.get("move_time"),
+            send_clock,
+            **limits
+        )
+    except ValueError as e:
+        print(f"ERROR: {e} Aborted.")
+        return
+
+    if (use_async):
+        tournament.run_async()
+    else:
+        tournament.run()
+    tournament.print_standings()
+
+
+if __name__ == "__main__":
+    main()
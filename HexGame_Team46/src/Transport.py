@@ -0,0 +1,195 @@
+"""Sockets the engine and the agents can talk over.
+
+The engine tells an agent where to connect in the HEX_ADDRESS environment
+variable, which is one of:
+* "tcp:host:port" for a loopback TCP connection, with Nagle's algorithm
+disabled on both ends.
+* "unix:path" for a Unix domain socket.
+* "fd:n" for one end of a socketpair the agent inherits as file
+descriptor n.
+
+The Python agents under agents/ open their connection with
+Transport.connect, importing this module after appending ../../src to
+sys.path, so there is one copy of the client side to keep up to date.
+
+Run this script to print the round-trip latency of every transport.
+Possible arguments:
+* "rounds=n" sets the number of messages sent per transport.
+"""
+import os
+import shlex
+import socket
+import tempfile
+from statistics import mean, median
+from sys import argv, executable
+from time import time_ns
+
+
+class Transport():
+    """Static class that opens the sockets of every transport."""
+
+    TYPES = ("tcp", "unix", "socketpair")
+
+    @staticmethod
+    def listen(transport, host="127.0.0.1", port=0):
+        """Returns a listening socket for the given transport and the
+        address agents should connect to. A socketpair needs no listening
+        socket, so (None, None) is returned for it.
+        """
+
+        if (transport == "tcp"):
+            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            s.bind((host, port))
+            s.listen()
+            return s, f"tcp:{host}:{s.getsockname()[1]}"
+
+        if (transport == "unix"):
+            path = os.path.join(tempfile.mkdtemp(prefix="hex-"), "engine")
+            s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            s.bind(path)
+            s.listen()
+            return s, f"unix:{path}"
+
+        if (transport == "socketpair"):
+            return None, None
+
+        raise ValueError(f"Unknown transport {transport}.")
+
+    @staticmethod
+    def pair():
+        """Returns a connected socketpair as the engine end, the agent end
+        and the address of the agent end. The agent end has to be passed
+        to the agent process, then closed in the engine.
+        """
+
+        engine, agent = socket.socketpair()
+        agent.set_inheritable(True)
+        return engine, agent, f"fd:{agent.fileno()}"
+
+    @staticmethod
+    def connect(address=None):
+        """Returns a socket connected to the given address. Defaults to
+        HEX_ADDRESS, or TCP on HEX_PORT if it is not set.
+        """
+
+        if (address is None):
+            address = os.environ.get(
+                "HEX_ADDRESS",
+                f"tcp:127.0.0.1:{os.environ.get('HEX_PORT', 1234)}"
+            )
+
+        kind, _, location = address.partition(":")
+        if (kind == "fd"):
+            return socket.socket(fileno=int(location))
+
+        if (kind == "unix"):
+            s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            s.connect(location)
+            return s
+
+        host, _, port = location.rpartition(":")
+        s = socket.create_connection((host, int(port)))
+        Transport.set_nodelay(s)
+        return s
+
+    @staticmethod
+    def set_nodelay(s):
+        """Sends small writes on a TCP socket at once instead of waiting
+        to join them (Nagle's algorithm). Other sockets are left as they
+        are.
+        """
+
+        if (s.family in (socket.AF_INET, socket.AF_INET6)):
+            s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    @staticmethod
+    def remove(address):
+        """Removes the file of a Unix domain socket address, if any."""
+
+        if (address is None or not address.startswith("unix:")):
+            return
+
+        path = address.partition(":")[2]
+        try:
+            os.unlink(path)
+            os.rmdir(os.path.dirname(path))
+        except OSError:
+            pass
+
+
+def echo():
+    """Connects like an agent and sends every message back."""
+
+    s = Transport.connect()
+    token = os.environ.get("HEX_TOKEN")
+    if (token is not None):
+        s.sendall(bytes(f"HELLO;{token}\n", "utf-8"))
+
+    reader = s.makefile("rb")
+    for line in reader:
+        s.sendall(line)
+
+
+def measure_latency(transport, rounds=1000):
+    """Starts an echo agent over the given transport and returns the round
+    trip time of each of rounds move-sized messages, in nanoseconds. One
+    message is sent before timing starts, so that the agent is up and
+    running.
+    """
+
+    # imported here because Protocol imports this module
+    from Colour import Colour
+    from Protocol import Protocol
+
+    Protocol.TRANSPORT = transport
+    Protocol.PORT = 0
+    Protocol.start()
+    try:
+        run_s = (
+            f"{shlex.quote(executable)} " +
+            f"{shlex.quote(os.path.realpath(__file__))} -echo"
+        )
+        if (not Protocol.accept_connection(run_s, "echo", 10*10**9)):
+            raise ConnectionError("The echo agent never connected.")
+
+        Protocol.send_message(Colour.RED, "5,5\n")
+        Protocol.get_message(Colour.RED)
+
+        times = []
+        for i in range(rounds):
+            start = time_ns()
+            Protocol.send_message(Colour.RED, "5,5\n")
+            Protocol.get_message(Colour.RED)
+            times.append(time_ns() - start)
+    finally:
+        Protocol.close()
+
+    return times
+
+
+def main():
+    rounds = 1000
+    for argument in argv[1:]:
+        if (argument.startswith("rounds=")):
+            rounds = int(argument.split("=")[1])
+
+    print("Transport   Mean (us)  Median (us)  Max (us)")
+    for transport in Transport.TYPES:
+        try:
+            times = measure_latency(transport, rounds)
+        except Exception as e:
+            print(f"{transport:<10}  unavailable: {e}")
+            continue
+
+        print(
+            f"{transport:<10}  {mean(times)/1000:>9.1f}  " +
+            f"{median(times)/1000:>11.1f}  {max(times)/1000:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    if ("-echo" in argv):
+        echo()
+    else:
+        main()
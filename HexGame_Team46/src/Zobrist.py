@@ -0,0 +1,35 @@
+from random import Random
+
+from Colour import Colour
+
+
+class Zobrist():
+    """Static class that holds the Zobrist keys used to hash boards.
+
+    Every board of a given size shares the same keys, so hashes can be
+    compared across boards and processes. A position hashes to the XOR of
+    the keys of its stones, so placing or removing a stone is one XOR.
+    """
+
+    # fixed so that hashes are the same in every run
+    SEED = 0x4845580000000046
+    _KEYS = {}
+
+    @staticmethod
+    def get_keys(board_size):
+        """Returns a dict mapping each colour to a list of 64-bit keys, one
+        per tile, where tile (x, y) is at x * board_size + y.
+        """
+
+        keys = Zobrist._KEYS.get(board_size)
+        if (keys is not None):
+            return keys
+
+        rng = Random(Zobrist.SEED + board_size)
+        cell_count = board_size * board_size
+        keys = {
+            Colour.RED: [rng.getrandbits(64) for i in range(cell_count)],
+            Colour.BLUE: [rng.getrandbits(64) for i in range(cell_count)]
+        }
+        Zobrist._KEYS[board_size] = keys
+        return keys
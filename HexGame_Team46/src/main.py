@@ -7,6 +7,8 @@ from sys import argv, platform
 from os.path import realpath, sep
 
 from Game import Game
+from Protocol import Protocol
+from Transport import Transport
 
 
 def main():
@@ -17,6 +19,12 @@ def main():
     silent_bots = ("-sb" in argv or "-silent_bots" in argv)
     java_ref_agent = ("-j" in argv or "-java" in argv)
     double = ("-d" in argv or "-double" in argv)
+    bitboard = ("-bb" in argv or "-bitboard" in argv)
+    log_thread = ("-lt" in argv or "-log_thread" in argv)
+    log_flush_interval = None
+    log_dir = None
+    send_clock = ("-c" in argv or "-clock" in argv)
+    time_control = {}
 
     board_size = 11
     agents = []
@@ -24,6 +32,36 @@ def main():
     for argument in argv:
         if ("agent=" in argument or "a=" in argument):
             agents.append(argument)
+        if (argument.startswith("log_flush=")):
+            try:
+                log_flush_interval = float(argument.split("=")[1])
+            except ValueError:
+                print("ERROR: Log flush interval is not a number. Aborted.")
+                return
+            continue
+        if (argument.split("=")[0] in ("time", "increment", "move_time")):
+            key, value = argument.split("=")
+            try:
+                time_control[key] = int(float(value) * 10**9)
+                if (time_control[key] < 0):
+                    raise ValueError()
+            except ValueError:
+                print(f"ERROR: {key} must be a number of seconds. Aborted.")
+                return
+            continue
+        if (argument.startswith("log_dir=")):
+            log_dir = argument.split("=", 1)[1]
+            continue
+        if (argument.startswith("transport=")):
+            transport = argument.split("=")[1]
+            if (transport not in Transport.TYPES):
+                print(
+                    "ERROR: Transport must be one of",
+                    f"{', '.join(Transport.TYPES)}. Aborted."
+                )
+                return
+            Protocol.TRANSPORT = transport
+            continue
         if ("board_size=" in argument or "b=" in argument):
             try:
                 board_size = int(argument.split("=")[1])
@@ -102,7 +140,15 @@ def main():
         log=log,
         print_protocol=print_protocol,
         kill_bots=kill_bots,
-        silent_bots=silent_bots
+        silent_bots=silent_bots,
+        bitboard=bitboard,
+        log_flush_interval=log_flush_interval,
+        log_thread=log_thread,
+        log_dir=log_dir,
+        time_limit=time_control.get("time", Game.MAXIMUM_TIME),
+        increment=time_control.get("increment", 0),
+        move_limit=time_control.get("move_time"),
+        send_clock=send_clock
     )
     g.run()
 